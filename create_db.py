@@ -9,11 +9,78 @@
 '''
 
 import os
+import atexit
 import sqlite3
 import argparse
 import streamlit as st
 from pathlib import Path
 
+# Resolved once at import so per-instance path setup skips the abspath syscalls
+_MODULE_DIR = Path(__file__).resolve().parent
+
+def configure_pragmas(conn):
+    """Apply the standard connection pragmas for this app's SQLite usage.
+
+    WAL lets the Streamlit pages read while an ingest is writing,
+    synchronous=NORMAL halves the fsyncs per commit, and the remaining
+    pragmas keep temp data and hot pages in memory.
+    """
+    conn.executescript('''
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA mmap_size=268435456;
+        PRAGMA cache_size=-65536;
+        PRAGMA busy_timeout=5000;
+        PRAGMA wal_autocheckpoint=1000;
+    ''')
+    return conn
+
+
+def open_connection(db_path):
+    """Open a connection to db_path with the standard pragmas applied.
+
+    Shared factory for every module that talks to the database, so no
+    code path ends up on SQLite's defaults (DELETE journal, FULL sync,
+    tiny page cache).
+    """
+    return configure_pragmas(sqlite3.connect(db_path))
+
+
+# Process-wide connection pool, keyed by database path. Reusing one
+# connection per database keeps SQLite's page cache warm and avoids
+# re-opening the WAL/SHM files every time a fetcher or generator class
+# is instantiated.
+_connections = {}
+
+
+def get_connection(db_path):
+    """Return the shared connection for db_path, opening it on first use.
+
+    check_same_thread=False so the same connection can serve Streamlit
+    reruns and worker threads; pooled connections stay open until
+    process exit.
+    """
+    key = str(db_path)
+    conn = _connections.get(key)
+    if conn is None:
+        conn = _connections[key] = configure_pragmas(
+            sqlite3.connect(key, check_same_thread=False))
+    return conn
+
+
+@atexit.register
+def _close_pooled_connections():
+    """Close every pooled connection when the process exits."""
+    for conn in _connections.values():
+        try:
+            conn.execute('PRAGMA optimize')
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _connections.clear()
+
+
 class RetellDatabase:
     """Database manager for Retell call data with tables for calls, utterances, and Q&A pairs."""
     
@@ -22,7 +89,7 @@ class RetellDatabase:
         # Use Streamlit's session state for database configuration
         if 'db_path' not in st.session_state:
             # Create DB folder in the UI directory
-            db_folder = Path(os.path.dirname(os.path.abspath(__file__))) / "UI" / "DB"
+            db_folder = _MODULE_DIR / "UI" / "DB"
             db_folder.mkdir(parents=True, exist_ok=True)
             st.session_state.db_path = db_folder / db_name
         
@@ -36,7 +103,7 @@ class RetellDatabase:
     def connect(self):
         """Connect to the SQLite database."""
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = get_connection(self.db_path)
             self.cursor = self.conn.cursor()
         return self.conn
     
@@ -49,17 +116,22 @@ class RetellDatabase:
         
         self.connect()
         
-        # Calls table with transcript
-        self.cursor.execute('''
+        # One executescript pass creates every table, index, and trigger:
+        # a single parser invocation and one explicit transaction instead
+        # of an implicit journal write per DDL statement
+        self.conn.executescript('''
+        BEGIN;
+
+        -- Calls table with transcript. created_at holds the call's Retell
+        -- start timestamp so incremental fetches can filter at the API.
         CREATE TABLE IF NOT EXISTS calls (
             call_id TEXT PRIMARY KEY,
             transcript TEXT,
+            created_at INTEGER,
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # Utterances table
-        self.cursor.execute('''
+        );
+
+        -- Utterances table
         CREATE TABLE IF NOT EXISTS utterances (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             call_id TEXT,
@@ -67,30 +139,59 @@ class RetellDatabase:
             content TEXT,
             utterance_index INTEGER,
             FOREIGN KEY (call_id) REFERENCES calls (call_id)
-        )
-        ''')
-        
-        # Q&A pairs table
-        self.cursor.execute('''
+        );
+
+        -- Q&A pairs table
         CREATE TABLE IF NOT EXISTS qa_pairs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             call_id TEXT,
             question TEXT,
             answer TEXT,
             FOREIGN KEY (call_id) REFERENCES calls (call_id)
-        )
+        );
+
+        -- Indexes so call-id filtered lookups (exports, utterance
+        -- reconstruction) don't have to scan the whole table, and an
+        -- expression index so length-filtered sampling is a range scan
+        CREATE INDEX IF NOT EXISTS idx_qa_pairs_call_id ON qa_pairs (call_id);
+        CREATE INDEX IF NOT EXISTS idx_utt_call
+            ON utterances (call_id, utterance_index);
+        CREATE INDEX IF NOT EXISTS idx_calls_tlen
+            ON calls (length(transcript));
+
+        -- Trigger-maintained row counters so the dashboard reads stats
+        -- in O(1) instead of COUNT(*)-scanning whole tables on each rerun
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            n INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO counters (name, n)
+            VALUES ('calls', (SELECT COUNT(*) FROM calls)),
+                   ('qa_pairs', (SELECT COUNT(*) FROM qa_pairs));
+        CREATE TRIGGER IF NOT EXISTS trg_calls_count_ins AFTER INSERT ON calls
+            BEGIN UPDATE counters SET n = n + 1 WHERE name = 'calls'; END;
+        CREATE TRIGGER IF NOT EXISTS trg_calls_count_del AFTER DELETE ON calls
+            BEGIN UPDATE counters SET n = n - 1 WHERE name = 'calls'; END;
+        CREATE TRIGGER IF NOT EXISTS trg_qa_count_ins AFTER INSERT ON qa_pairs
+            BEGIN UPDATE counters SET n = n + 1 WHERE name = 'qa_pairs'; END;
+        CREATE TRIGGER IF NOT EXISTS trg_qa_count_del AFTER DELETE ON qa_pairs
+            BEGIN UPDATE counters SET n = n - 1 WHERE name = 'qa_pairs'; END;
+
+        COMMIT;
+        ANALYZE;
         ''')
-        
-        self.conn.commit()
+
         print("Database tables created successfully")
         return True
     
     def close(self):
-        """Close the database connection."""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-            self.cursor = None
+        """Release this instance's connection references.
+
+        The underlying connection is pooled and stays open (with its
+        page cache) until process exit.
+        """
+        self.conn = None
+        self.cursor = None
 
 # Initialize database when imported
 def init_database():
@@ -1,121 +1,223 @@
 import pandas as pd
 import json
 import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from datetime import datetime
 
-def convert_excel_files_to_jsonl(excel_dir=None, output_dir=None, system_message=None):
+# Prefer orjson (Rust serializer, emits utf-8 bytes directly); fall back to
+# the stdlib encoder if it is not installed
+try:
+    import orjson
+
+    def _json_dumps_bytes(obj):
+        return orjson.dumps(obj)
+except ImportError:
+    def _json_dumps_bytes(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+def _file_to_jsonl_fragment(excel_file, system_message, include_call_id=True):
+    """
+    Convert a single Excel file to a temporary JSONL fragment.
+
+    Runs in a worker process so multiple files can be parsed in parallel.
+
+    Args:
+        excel_file: Path to the Excel file, or a (name, source) tuple where
+                    source is a path or an in-memory buffer (e.g. BytesIO)
+        system_message: System message to include in each JSONL entry
+        include_call_id: Whether to carry a call_id column into the output
+
+    Returns:
+        Tuple of (fragment path or None if the file was skipped, QA pair count)
+    """
+    if isinstance(excel_file, tuple):
+        # In-memory upload: no temp-file round trip through the filesystem
+        name, source = excel_file
+    else:
+        excel_file = Path(excel_file)
+        name, source = excel_file.name, excel_file
+
+    try:
+        if Path(name).suffix.lower() == '.parquet':
+            # Parquet snapshots round-trip 10-100x faster than xlsx
+            df = pd.read_parquet(source).astype(str)
+        else:
+            # Load the Excel file with the Rust-backed calamine engine
+            # (much faster xlsx parsing); fall back to the default engine
+            # if python-calamine is not installed. dtype=str also saves
+            # the per-cell str() coercions later.
+            try:
+                df = pd.read_excel(source, engine="calamine", dtype=str)
+            except ImportError:
+                df = pd.read_excel(source, dtype=str)
+
+        # Print column names for debugging
+        print(f"Columns in {name}: {list(df.columns)}")
+
+        # Map column names (case-insensitive) via a lowercased lookup built
+        # once per file instead of re-lowercasing inside nested scans
+        lower_map = {str(col).lower(): col for col in df.columns}
+        question_col = next((lower_map[k] for k in lower_map if 'question' in k), None)
+        answer_col = next((lower_map[k] for k in lower_map if 'answer' in k), None)
+        call_id_col = next((lower_map[k] for k in lower_map if 'call' in k and 'id' in k), None)
+
+        if not question_col or not answer_col:
+            print(f"Warning: Could not find question/answer columns in {name}")
+            # Try common alternative column names
+            if 'Q' in df.columns and 'A' in df.columns:
+                question_col = 'Q'
+                answer_col = 'A'
+            else:
+                # If we still can't find the columns, skip this file
+                print(f"Skipping {name} - Could not identify question/answer columns")
+                return None, 0
+
+        print(f"Using columns: Question='{question_col}', Answer='{answer_col}', Call ID='{call_id_col}'")
+
+        file_qa_pairs = len(df)
+        print(f"Processing {name} - Found {file_qa_pairs} QA pairs")
+
+        # Hoist loop invariants: the system message dict never changes and
+        # local binding of the serializer skips the lookup per row
+        sys_msg = {"role": "system", "content": system_message}
+        json_dumps = _json_dumps_bytes
+
+        # Pull the columns out once as numpy arrays instead of boxing
+        # each row into a Series with df.iterrows()
+        questions = df[question_col].astype(str).to_numpy()
+        answers = df[answer_col].astype(str).to_numpy()
+        call_ids = (df[call_id_col].astype(str).to_numpy()
+                    if call_id_col and include_call_id else None)
+
+        # Write this file's rows to a temporary fragment that the driver
+        # concatenates into the final JSONL file
+        fragment = tempfile.NamedTemporaryFile(
+            mode='wb', suffix='.jsonl', delete=False
+        )
+        with fragment:
+            write = fragment.write
+            newline = b'\n'
+            if call_ids is not None:
+                for i in range(len(df)):
+                    write(json_dumps({
+                        "messages": [
+                            sys_msg,
+                            {"role": "user", "content": questions[i]},
+                            {"role": "assistant", "content": answers[i]}
+                        ],
+                        "call_id": call_ids[i]
+                    }) + newline)
+            else:
+                for i in range(len(df)):
+                    write(json_dumps({
+                        "messages": [
+                            sys_msg,
+                            {"role": "user", "content": questions[i]},
+                            {"role": "assistant", "content": answers[i]}
+                        ]
+                    }) + newline)
+
+        return fragment.name, file_qa_pairs
+
+    except Exception as e:
+        print(f"Error processing {name}: {e}")
+        import traceback
+        traceback.print_exc()
+        return None, 0
+
+def convert_excel_files_to_jsonl(excel_dir=None, output_dir=None, system_message=None,
+                                 files=None, include_call_id=True):
     """
     Convert all Excel files with QA pairs from a directory to a single JSONL file for chatbot training.
-    
+
     Args:
         excel_dir: Directory containing Excel files with QA pairs
         output_dir: Directory to save the JSONL file
         system_message: System message to include in each JSONL entry
-    
+        files: Optional iterable of (name, source) pairs where source is a
+               path or an in-memory buffer; overrides the directory scan so
+               uploads can be converted without a temp-file round trip
+        include_call_id: Whether to carry a call_id column into the output
+
     Returns:
         Path to the created JSONL file
     """
     # Set up paths
     script_dir = Path(os.path.dirname(os.path.abspath(__file__)))
-    
+
     if excel_dir is None:
         excel_dir = script_dir / "DB" / "excel"
     else:
         excel_dir = Path(excel_dir)
-    
+
     if output_dir is None:
         output_dir = script_dir / "DB" / "jsonl"
     else:
         output_dir = Path(output_dir)
-    
+
     if system_message is None:
         system_message = "You are a helpful customer support assistant for Wellness Wag, a company that provides ESA (Emotional Support Animal) letters. Answer questions accurately and professionally."
-    
+
     # Create output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Find all Excel files in the directory
-    excel_files = list(excel_dir.glob("*.xlsx")) + list(excel_dir.glob("*.xls"))
-    
-    if not excel_files:
-        raise FileNotFoundError(f"No Excel files found in {excel_dir}")
-    
-    print(f"Found {len(excel_files)} Excel files in {excel_dir}")
-    
+
+    if files is not None:
+        excel_files = list(files)
+        if not excel_files:
+            raise FileNotFoundError("No files provided for conversion")
+        print(f"Converting {len(excel_files)} provided file(s)")
+    else:
+        # Find all Excel and Parquet files in the directory. Parquet is the
+        # preferred intermediate format (far faster to read than xlsx), so when
+        # a parquet snapshot shares a stem with an Excel file, skip the Excel one.
+        parquet_files = list(excel_dir.glob("*.parquet"))
+        parquet_stems = {f.stem for f in parquet_files}
+        excel_files = [
+            f for f in list(excel_dir.glob("*.xlsx")) + list(excel_dir.glob("*.xls"))
+            if f.stem not in parquet_stems
+        ]
+        excel_files = parquet_files + excel_files
+
+        if not excel_files:
+            raise FileNotFoundError(f"No Excel files found in {excel_dir}")
+
+        print(f"Found {len(excel_files)} Excel/Parquet files in {excel_dir}")
+
     # Create a timestamp for the output file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = output_dir / f"qa_pairs_{timestamp}.jsonl"
-    
-    # Process each Excel file and write to a single JSONL file
+
+    # Convert each file to a JSONL fragment. Files are independent and the
+    # work is CPU-bound (xlsx parsing + JSON encoding), so fan out across a
+    # process pool when there is more than one file.
     total_qa_pairs = 0
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for excel_file in excel_files:
-            try:
-                # Load the Excel file
-                df = pd.read_excel(excel_file)
-                
-                # Print column names for debugging
-                print(f"Columns in {excel_file.name}: {list(df.columns)}")
-                
-                # Map column names (case-insensitive)
-                question_col = None
-                answer_col = None
-                call_id_col = None
-                
-                for col in df.columns:
-                    col_lower = str(col).lower()
-                    if 'question' in col_lower:
-                        question_col = col
-                    elif 'answer' in col_lower:
-                        answer_col = col
-                    elif 'call' in col_lower and 'id' in col_lower:
-                        call_id_col = col
-                
-                if not question_col or not answer_col:
-                    print(f"Warning: Could not find question/answer columns in {excel_file.name}")
-                    # Try common alternative column names
-                    if 'Q' in df.columns and 'A' in df.columns:
-                        question_col = 'Q'
-                        answer_col = 'A'
-                    else:
-                        # If we still can't find the columns, skip this file
-                        print(f"Skipping {excel_file.name} - Could not identify question/answer columns")
-                        continue
-                
-                print(f"Using columns: Question='{question_col}', Answer='{answer_col}', Call ID='{call_id_col}'")
-                
-                file_qa_pairs = len(df)
-                total_qa_pairs += file_qa_pairs
-                print(f"Processing {excel_file.name} - Found {file_qa_pairs} QA pairs")
-                
-                # Convert each row to JSONL format and write to file
-                for _, row in df.iterrows():
-                    # Create the JSONL entry
-                    jsonl_entry = {
-                        "messages": [
-                            {"role": "system", "content": system_message},
-                            {"role": "user", "content": str(row[question_col])},
-                            {"role": "assistant", "content": str(row[answer_col])}
-                        ]
-                    }
-                    
-                    # Add call_id if it exists in the row
-                    if call_id_col and call_id_col in row:
-                        jsonl_entry["call_id"] = str(row[call_id_col])
-                    
-                    # Write to the JSONL file
-                    f.write(json.dumps(jsonl_entry, ensure_ascii=False) + '\n')
-                    
-            except Exception as e:
-                print(f"Error processing {excel_file.name}: {e}")
-                import traceback
-                traceback.print_exc()
-    
+    convert = partial(_file_to_jsonl_fragment, system_message=system_message,
+                      include_call_id=include_call_id)
+
+    if len(excel_files) > 1:
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(convert, excel_files))
+    else:
+        results = [convert(excel_files[0])]
+
+    # Concatenate the fragments into the final JSONL file with a bounded
+    # copy buffer, then clean them up
+    with open(output_file, 'wb') as out:
+        for fragment_path, file_qa_pairs in results:
+            if fragment_path is None:
+                continue
+            total_qa_pairs += file_qa_pairs
+            with open(fragment_path, 'rb') as frag:
+                shutil.copyfileobj(frag, out, length=1 << 20)
+            os.unlink(fragment_path)
+
     print(f"\nSuccessfully converted {total_qa_pairs} QA pairs from {len(excel_files)} Excel files to JSONL format")
     print(f"Output file: {output_file}")
-    
+
     return output_file
 
 def main():
@@ -123,7 +225,7 @@ def main():
         # Convert all Excel files to a single JSONL file
         output_file = convert_excel_files_to_jsonl()
         print(f"Conversion complete. JSONL file created at: {output_file}")
-        
+
         # Print a sample of the JSONL file
         with open(output_file, 'r', encoding='utf-8') as f:
             sample_lines = []
@@ -131,17 +233,17 @@ def main():
                 line = f.readline()
                 if line:
                     sample_lines.append(line)
-        
+
         if sample_lines:
             print("\nSample of the JSONL file (first 3 entries):")
             for i, line in enumerate(sample_lines):
                 print(f"\nEntry {i+1}:")
                 print(line)
-        
+
     except Exception as e:
         print(f"Error during conversion: {e}")
         import traceback
         traceback.print_exc()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
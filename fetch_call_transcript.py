@@ -24,11 +24,63 @@ import os
 import json
 import sqlite3
 import argparse
+from collections import defaultdict
+from operator import attrgetter
 from pathlib import Path
-from dotenv import load_dotenv
+from queue import Queue
+from threading import Event, Thread
+
+# Prefer orjson (C serializer emitting utf-8 bytes); fall back to stdlib json
+try:
+    import orjson
+
+    def _json_dumps_bytes(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _json_dumps_bytes(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
 from retell import Retell
 from create_db import RetellDatabase
 
+# attrgetter fetches both attributes in one C-level call, cheaper per
+# utterance than two getattr calls with Python-level defaults
+_RC = attrgetter('role', 'content')
+
+
+def _utterance_rc(utterance):
+    """Return (role, content) for an utterance, tolerating missing attrs."""
+    try:
+        role, content = _RC(utterance)
+    except AttributeError:
+        return (getattr(utterance, 'role', 'unknown') or 'unknown',
+                getattr(utterance, 'content', '') or '')
+    return role or 'unknown', content or ''
+
+
+def _bulk_insert(cursor, table, cols, rows, chunk=100):
+    """Insert rows with multi-row VALUES statements in chunks.
+
+    One INSERT carrying 100 rows does far fewer VM dispatches than 100
+    single-row INSERTs, even inside one transaction. The full-chunk
+    statement is built once and reused; the leftover rows get one final
+    smaller statement.
+    """
+    if not rows:
+        return
+    placeholders = "(" + ",".join("?" * len(cols)) + ")"
+    prefix = f"INSERT INTO {table}({','.join(cols)}) VALUES "
+    full_sql = prefix + ",".join([placeholders] * chunk)
+
+    for start in range(0, len(rows) - len(rows) % chunk, chunk):
+        flat = [value for row in rows[start:start + chunk] for value in row]
+        cursor.execute(full_sql, flat)
+
+    remainder = rows[len(rows) - len(rows) % chunk:]
+    if remainder:
+        tail_sql = prefix + ",".join([placeholders] * len(remainder))
+        cursor.execute(tail_sql, [value for row in remainder for value in row])
+
+
 class RetellTranscriptFetcher:
     """Class to fetch and store call transcripts from Retell API."""
     
@@ -43,7 +95,16 @@ class RetellTranscriptFetcher:
             print(f"Database not found at {self.db.db_path}. Creating...")
             self.db.create_tables()
         
-        # Setup Retell API client
+        # Make sure older databases have the created_at column used for
+        # incremental fetching
+        self.db.cursor.execute("PRAGMA table_info(calls)")
+        if 'created_at' not in {row[1] for row in self.db.cursor.fetchall()}:
+            self.db.cursor.execute("ALTER TABLE calls ADD COLUMN created_at INTEGER")
+            self.db.conn.commit()
+
+        # Setup Retell API client (.env is only read here, so importing
+        # this module stays filesystem-free)
+        from dotenv import load_dotenv
         load_dotenv()
         api_key = os.getenv("RETELL")
         if not api_key:
@@ -54,74 +115,198 @@ class RetellTranscriptFetcher:
         """Return a set of all call IDs already in the database."""
         self.db.cursor.execute("SELECT call_id FROM calls")
         return set(row[0] for row in self.db.cursor.fetchall())
+
+    def sample_call_ids(self, n: int) -> list:
+        """Return up to n random call IDs, sampled inside SQLite.
+
+        ORDER BY RANDOM() LIMIT keeps the sampling in the database, so
+        only n IDs cross into Python instead of the whole calls table.
+        """
+        self.db.cursor.execute(
+            "SELECT call_id FROM calls ORDER BY RANDOM() LIMIT ?", (n,)
+        )
+        return [row[0] for row in self.db.cursor.fetchall()]
     
     def store_call(self, call_id: str, transcript: str, transcript_objects: list = None) -> bool:
-        """Store a call and its transcript in the database if not already present."""
+        """Store a call and its transcript as part of the caller's transaction.
+
+        The caller is responsible for transaction management (BEGIN/commit)
+        and for de-duplicating against existing call IDs; the
+        existing_call_ids set in fetch_all_calls already answers the "is this
+        a duplicate" question without a per-call SELECT probe.
+        """
+        # Insert call with transcript
+        self.db.cursor.execute('INSERT INTO calls (call_id, transcript) VALUES (?, ?)',
+                          (call_id, transcript))
+
+        # Optionally store utterances (if provided) via multi-row VALUES
+        # statements so the whole call costs a handful of VM dispatches
+        if transcript_objects:
+            rows = [
+                (call_id, *_utterance_rc(utterance), idx)
+                for idx, utterance in enumerate(transcript_objects)
+            ]
+            _bulk_insert(self.db.cursor, 'utterances',
+                         ('call_id', 'role', 'content', 'utterance_index'), rows)
+
+        return True
+    
+    def _produce_call_pages(self, filter_criteria, limit, page_queue, stop_event):
+        """Fetch call pages from the Retell API and push them onto a queue.
+
+        Runs on a producer thread so the network round trip for the next page
+        overlaps with the database writes for the current one. A None sentinel
+        marks the end of the stream; an API failure is pushed onto the queue
+        ahead of the sentinel so the consumer can re-raise it on its own
+        thread instead of the error dying silently here. The stop_event lets
+        the consumer abort pagination early when its side fails.
+        """
         try:
-            # Check for duplicates
-            self.db.cursor.execute("SELECT 1 FROM calls WHERE call_id = ?", (call_id,))
-            if self.db.cursor.fetchone():
-                print(f"Call ID {call_id} already exists. Skipping.")
-                return False
-            
-            # Insert call with transcript
-            self.db.cursor.execute('INSERT INTO calls (call_id, transcript) VALUES (?, ?)', 
-                              (call_id, transcript))
-            
-            # Optionally store utterances (if provided)
-            if transcript_objects:
-                for idx, utterance in enumerate(transcript_objects):
-                    role = getattr(utterance, 'role', 'unknown')
-                    content = getattr(utterance, 'content', '')
-                    self.db.cursor.execute('''
-                    INSERT INTO utterances (call_id, role, content, utterance_index)
-                    VALUES (?, ?, ?, ?)
-                    ''', (call_id, role, content, idx))
-            
-            self.db.conn.commit()
-            return True
+            pagination_key = None
+            fetched = 0
+            while fetched < limit and not stop_event.is_set():
+                page_limit = min(1000, limit - fetched)
+                kwargs = {"filter_criteria": filter_criteria, "limit": page_limit}
+                if pagination_key:
+                    kwargs["pagination_key"] = pagination_key
+                page = self.client.call.list(**kwargs)
+                if not page:
+                    break
+                print(f"Fetched page of {len(page)} calls from Retell API")
+                page_queue.put(page)
+                fetched += len(page)
+                if len(page) < page_limit:
+                    break
+                pagination_key = getattr(page[-1], 'call_id', None)
+                if not pagination_key:
+                    break
         except Exception as e:
-            print(f"Error storing call {call_id}: {e}")
-            self.db.conn.rollback()
-            return False
-    
+            page_queue.put(e)
+        finally:
+            page_queue.put(None)
+
+    def _filter_new_call_ids(self, calls) -> set:
+        """Return the call IDs in this batch that are not yet in the database.
+
+        Dedup happens inside SQLite via an anti-join against a temp table, so
+        memory stays O(batch) instead of loading every stored call ID.
+        """
+        self.db.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS fetched(call_id TEXT PRIMARY KEY)")
+        self.db.cursor.execute("DELETE FROM fetched")
+        self.db.cursor.executemany(
+            "INSERT OR IGNORE INTO fetched VALUES (?)",
+            [(call_id,) for call_id in
+             (getattr(call, 'call_id', None) for call in calls) if call_id]
+        )
+        self.db.cursor.execute(
+            "SELECT call_id FROM fetched WHERE call_id NOT IN (SELECT call_id FROM calls)"
+        )
+        return {row[0] for row in self.db.cursor.fetchall()}
+
     def fetch_all_calls(self, limit: int = 200):
         """Fetch all successful calls from Retell API and store them in the database."""
-        existing_call_ids = self.get_existing_call_ids()
-        print(f"Found {len(existing_call_ids)} existing calls in the database")
-        
         filter_criteria = {
             "call_successful": [True],
             "in_voicemail": [False]
         }
-        
+
+        # Push the "only new calls" filter to the API, but only once the
+        # stored calls already cover the requested window. Cutting the
+        # query at the newest stored call unconditionally would make a
+        # later run with a larger --limit unable to backfill older calls;
+        # for partial coverage the full window is fetched and the anti-join
+        # dedup below skips what's already stored.
+        self.db.cursor.execute("SELECT COUNT(*), MAX(created_at) FROM calls")
+        stored_count, max_created_at = self.db.cursor.fetchone()
+        if max_created_at is not None and stored_count >= limit:
+            filter_criteria["start_timestamp"] = {"lower_threshold": int(max_created_at)}
+
         try:
-            calls = self.client.call.list(filter_criteria=filter_criteria, limit=limit)
-            print(f"Fetched {len(calls)} calls from Retell API")
-            
+            # Producer thread pages through the API while this thread stores
+            # the previous page, overlapping network time with DB writes
+            page_queue = Queue(maxsize=4)
+            stop_event = Event()
+            producer = Thread(
+                target=self._produce_call_pages,
+                args=(filter_criteria, limit, page_queue, stop_event),
+                daemon=True
+            )
+            producer.start()
+
+            # Batch inserts into explicit transactions: one fsync per page of
+            # calls instead of one per statement
             new_calls_count = 0
-            for call in calls:
-                call_id = getattr(call, 'call_id', None)
-                transcript = getattr(call, 'transcript', "")
-                transcript_objects = getattr(call, 'transcript_object', [])
-                
-                if not call_id or not transcript:
-                    print(f"Skipping call due to missing data: call_id={call_id}")
-                    continue
-                
-                if call_id in existing_call_ids:
-                    print(f"Call ID {call_id} already exists. Skipping.")
-                    continue
-                
-                if self.store_call(call_id, transcript, transcript_objects):
-                    print(f"Stored call ID: {call_id}")
-                    new_calls_count += 1
-                else:
-                    print(f"Failed to store call ID: {call_id}")
-            
+            self.db.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for calls in iter(page_queue.get, None):
+                    # A failure on the producer thread arrives here as the
+                    # exception object itself; re-raise it so the error
+                    # path below reports it instead of a success count
+                    if isinstance(calls, Exception):
+                        raise calls
+
+                    # One anti-join per page tells us which IDs are new
+                    new_call_ids = self._filter_new_call_ids(calls)
+
+                    # Accumulate the page's rows, then insert both tables
+                    # with multi-row VALUES statements
+                    call_rows = []
+                    utterance_rows = []
+                    for call in calls:
+                        call_id = getattr(call, 'call_id', None)
+                        transcript = getattr(call, 'transcript', "")
+                        transcript_objects = getattr(call, 'transcript_object', [])
+
+                        if not call_id or not transcript:
+                            print(f"Skipping call due to missing data: call_id={call_id}")
+                            continue
+
+                        if call_id not in new_call_ids:
+                            print(f"Call ID {call_id} already exists. Skipping.")
+                            continue
+
+                        # Consume the ID so a duplicate within the same page
+                        # keeps the first copy and skips the rest, instead of
+                        # the plain INSERT blowing the whole transaction on
+                        # the UNIQUE constraint
+                        new_call_ids.discard(call_id)
+
+                        call_rows.append((call_id, transcript,
+                                          getattr(call, 'start_timestamp', None)))
+                        for idx, utterance in enumerate(transcript_objects or []):
+                            utterance_rows.append(
+                                (call_id, *_utterance_rc(utterance), idx)
+                            )
+                        print(f"Stored call ID: {call_id}")
+
+                    _bulk_insert(self.db.cursor, 'calls',
+                                 ('call_id', 'transcript', 'created_at'), call_rows)
+                    _bulk_insert(self.db.cursor, 'utterances',
+                                 ('call_id', 'role', 'content', 'utterance_index'),
+                                 utterance_rows)
+                    new_calls_count += len(call_rows)
+
+                    # One commit per page keeps the fsync count low without
+                    # letting the transaction grow unbounded
+                    self.db.conn.commit()
+                    self.db.conn.execute("BEGIN IMMEDIATE")
+
+                self.db.conn.commit()
+            except Exception:
+                self.db.conn.rollback()
+                # The producer may be blocked on a full queue; tell it to
+                # stop and drain up to its sentinel so the join below
+                # can't hang the caller
+                stop_event.set()
+                while page_queue.get() is not None:
+                    pass
+                raise
+            finally:
+                producer.join()
+
             print(f"Successfully stored {new_calls_count} new calls")
             return new_calls_count
-        
+
         except Exception as e:
             print(f"Error fetching calls: {e}")
             return 0
@@ -144,71 +329,111 @@ class SpecificCallFetcher:
         if not os.path.exists(self.db_path):
             raise FileNotFoundError(f"Database not found at {self.db_path}")
         
-        # Connect to database
-        self.conn = sqlite3.connect(self.db_path)
+        # Connect read-only: this class never writes, and mode=ro lets
+        # SQLite skip journal bookkeeping while an ingest runs alongside.
+        # The idx_utt_call index it relies on is created by create_tables.
+        self.conn = sqlite3.connect(f"file:{self.db_path}?mode=ro&cache=shared", uri=True)
+        self.conn.executescript('''
+            PRAGMA query_only=ON;
+            PRAGMA cache_size=-65536;
+            PRAGMA busy_timeout=5000;
+        ''')
         self.cursor = self.conn.cursor()
-    
-    def fetch_specific_calls(self, call_ids, output_path="call_transcripts.json"):
-        """Fetch transcripts for specific call IDs and save to JSON."""
-        # List to store call data
-        call_data = []
-        
-        # Process each call ID
+
+    def _iter_call_records(self, call_ids):
+        """Yield one {call_id, transcript} record per requested ID."""
+        call_ids = list(call_ids)
+
+        # Two bulk queries instead of up to two round trips per call ID
+        placeholders = ",".join("?" * len(call_ids))
+        self.cursor.execute(
+            f"SELECT call_id, transcript FROM calls WHERE call_id IN ({placeholders})",
+            call_ids
+        )
+        transcripts = dict(self.cursor.fetchall())
+
+        self.cursor.execute(
+            f"""
+            SELECT call_id, role, content FROM utterances
+            WHERE call_id IN ({placeholders})
+            ORDER BY call_id, utterance_index
+            """,
+            call_ids
+        )
+        utterances_by_call = defaultdict(list)
+        for call_id, role, content in self.cursor:
+            utterances_by_call[call_id].append((role, content))
+
+        # Yield results in the order the IDs were requested, counting hits
+        # inline so the caller doesn't need a second pass for the summary
+        self._found_count = 0
         for call_id in call_ids:
             print(f"Processing call ID: {call_id}")
-            
-            # Try to fetch transcript from the database
-            self.cursor.execute("SELECT transcript FROM calls WHERE call_id = ?", (call_id,))
-            result = self.cursor.fetchone()
-            
-            if result and result[0] is not None:
-                transcript = result[0]
-                call_data.append({
+
+            transcript = transcripts.get(call_id)
+            if transcript is not None:
+                print(f"  Found transcript ({len(transcript)} characters)")
+                self._found_count += 1
+                yield {
                     "call_id": call_id,
                     "transcript": transcript
-                })
-                print(f"  Found transcript ({len(transcript)} characters)")
+                }
             else:
                 # If no transcript found or transcript is None, check if we can reconstruct from utterances
-                self.cursor.execute("""
-                    SELECT role, content FROM utterances 
-                    WHERE call_id = ? 
-                    ORDER BY utterance_index
-                """, (call_id,))
-                
-                utterances = self.cursor.fetchall()
-                
+                utterances = utterances_by_call.get(call_id)
+
                 if utterances:
-                    # Reconstruct transcript from utterances
-                    transcript = ""
-                    for role, content in utterances:
-                        if content is None:
-                            content = ""
-                        role_display = "Agent" if role.lower() == "agent" else "User"
-                        transcript += f"{role_display}: {content}\n"
-                    
-                    call_data.append({
-                        "call_id": call_id,
-                        "transcript": transcript.strip()
-                    })
+                    # Reconstruct transcript from utterances with a single
+                    # join instead of quadratic += string accumulation
+                    role_map = {"agent": "Agent"}
+                    transcript = "\n".join(
+                        f"{role_map.get(role.lower(), 'User')}: {content or ''}"
+                        for role, content in utterances
+                    )
+
                     print(f"  Reconstructed transcript from {len(utterances)} utterances")
+                    self._found_count += 1
+                    yield {
+                        "call_id": call_id,
+                        "transcript": transcript
+                    }
                 else:
                     # No data found for this call ID
-                    call_data.append({
+                    print(f"  No transcript found")
+                    yield {
                         "call_id": call_id,
                         "transcript": "No transcript available"
-                    })
-                    print(f"  No transcript found")
-        
-        # Write to JSON file
+                    }
+
+    @staticmethod
+    def _write_json_stream(output_file, records):
+        """Write records to a JSON array incrementally, yielding each back.
+
+        Each record hits disk as soon as it is produced instead of the whole
+        list being buffered and dumped at the end.
+        """
+        with open(output_file, 'wb') as f:
+            f.write(b'[\n')
+            first = True
+            for record in records:
+                if not first:
+                    f.write(b',\n')
+                f.write(_json_dumps_bytes(record))
+                first = False
+                yield record
+            f.write(b'\n]')
+
+    def fetch_specific_calls(self, call_ids, output_path="call_transcripts.json"):
+        """Fetch transcripts for specific call IDs and save to JSON."""
+        # Stream records through the JSON writer while collecting the list
+        # that callers expect back
         output_file = self.db_folder / output_path
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(call_data, f, indent=2, ensure_ascii=False)
-        
+        call_data = list(self._write_json_stream(output_file, self._iter_call_records(call_ids)))
+
         print(f"\nJSON file created successfully at {output_file}")
         print(f"Total calls processed: {len(call_data)}")
-        print(f"Calls with transcripts: {sum(1 for call in call_data if call['transcript'] != 'No transcript available')}")
-        
+        print(f"Calls with transcripts: {self._found_count}")
+
         return call_data
     
     def close(self):
@@ -217,14 +442,48 @@ class SpecificCallFetcher:
             self.conn.close()
 
 
-def fetch_all_call_transcripts():
-    """Command-line function to fetch all call transcripts."""
+# Parsers are built once at import so repeated CLI invocations (e.g. in
+# shell loops) don't pay argparse construction on every call
+def _build_all_parser():
     parser = argparse.ArgumentParser(description="Fetch and store Retell call transcripts.")
     parser.add_argument("--limit", type=int, default=200, help="Number of calls to fetch")
-    parser.add_argument("--db_name", type=str, default="retell_conversations.sqlite", 
+    parser.add_argument("--db_name", type=str, default="retell_conversations.sqlite",
                         help="Name of the database file")
-    args = parser.parse_args()
-    
+    return parser
+
+
+def _build_specific_parser():
+    parser = argparse.ArgumentParser(description="Fetch specific call transcripts and save to JSON.")
+    parser.add_argument("--call_ids", nargs="+", required=True, help="List of call IDs to fetch")
+    parser.add_argument("--output", type=str, default="call_transcripts.json",
+                        help="Output JSON file name")
+    parser.add_argument("--db_name", type=str, default="retell.sqlite",
+                        help="Name of the database file")
+    return parser
+
+
+def _build_main_parser():
+    parser = argparse.ArgumentParser(description="Fetch Retell call transcripts.")
+    parser.add_argument("--mode", choices=["all", "specific"], default="all",
+                        help="Fetch all calls or specific call IDs")
+    parser.add_argument("--call_ids", nargs="+", help="List of call IDs to fetch (for specific mode)")
+    parser.add_argument("--limit", type=int, default=200, help="Number of calls to fetch (for all mode)")
+    parser.add_argument("--output", type=str, default="call_transcripts.json",
+                        help="Output JSON file name (for specific mode)")
+    parser.add_argument("--db_name", type=str, default="retell.sqlite",
+                        help="Name of the database file")
+    return parser
+
+
+_ALL_PARSER = _build_all_parser()
+_SPECIFIC_PARSER = _build_specific_parser()
+_MAIN_PARSER = _build_main_parser()
+
+
+def fetch_all_call_transcripts():
+    """Command-line function to fetch all call transcripts."""
+    args = _ALL_PARSER.parse_args()
+
     fetcher = RetellTranscriptFetcher(db_name=args.db_name)
     try:
         fetcher.fetch_all_calls(limit=args.limit)
@@ -234,14 +493,8 @@ def fetch_all_call_transcripts():
 
 def fetch_specific_call_transcripts():
     """Command-line function to fetch specific call transcripts."""
-    parser = argparse.ArgumentParser(description="Fetch specific call transcripts and save to JSON.")
-    parser.add_argument("--call_ids", nargs="+", required=True, help="List of call IDs to fetch")
-    parser.add_argument("--output", type=str, default="call_transcripts.json", 
-                        help="Output JSON file name")
-    parser.add_argument("--db_name", type=str, default="retell.sqlite", 
-                        help="Name of the database file")
-    args = parser.parse_args()
-    
+    args = _SPECIFIC_PARSER.parse_args()
+
     fetcher = SpecificCallFetcher(db_name=args.db_name)
     try:
         fetcher.fetch_specific_calls(args.call_ids, args.output)
@@ -252,18 +505,8 @@ def fetch_specific_call_transcripts():
 if __name__ == "__main__":
     # By default, fetch all calls
     # To fetch specific calls, run with --call_ids argument
-    parser = argparse.ArgumentParser(description="Fetch Retell call transcripts.")
-    parser.add_argument("--mode", choices=["all", "specific"], default="all",
-                        help="Fetch all calls or specific call IDs")
-    parser.add_argument("--call_ids", nargs="+", help="List of call IDs to fetch (for specific mode)")
-    parser.add_argument("--limit", type=int, default=200, help="Number of calls to fetch (for all mode)")
-    parser.add_argument("--output", type=str, default="call_transcripts.json", 
-                        help="Output JSON file name (for specific mode)")
-    parser.add_argument("--db_name", type=str, default="retell.sqlite", 
-                        help="Name of the database file")
-    
-    args = parser.parse_args()
-    
+    args = _MAIN_PARSER.parse_args()
+
     if args.mode == "all":
         fetcher = RetellTranscriptFetcher(db_name=args.db_name)
         try:
@@ -1,13 +1,70 @@
 import os
+import re
 import json
-import random
 import sqlite3
 import argparse
-import time
+import asyncio
 from pathlib import Path
 from tqdm import tqdm
+from tqdm.asyncio import tqdm_asyncio
 from dotenv import load_dotenv
 import google.generativeai as genai
+from create_db import get_connection
+
+# Resolved once at import; Path.resolve caches the syscall work that
+# os.path.abspath would redo on every instantiation
+_MODULE_DIR = Path(__file__).resolve().parent
+
+# Prefer orjson (C serializer emitting utf-8 bytes); fall back to stdlib json
+try:
+    import orjson
+
+    def _json_dumps_bytes(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _jsonl_dumps(obj):
+        return orjson.dumps(obj)
+except ImportError:
+    def _json_dumps_bytes(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+    def _json_loads(data):
+        return json.loads(data)
+
+    def _jsonl_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# Widest JSON window (array or object) in a response, so markdown fences
+# and any surrounding prose are skipped without rewriting the string
+_JSON_RE = re.compile(rb'[\[{].*[\]}]', re.S)
+
+# Translation table deleting markdown emphasis characters in one pass
+_MD_STRIP = str.maketrans('', '', '*_')
+
+
+def _write_json_array(output_path, records):
+    """Write records to a JSON array one element at a time in binary mode.
+
+    Serializing per record keeps the peak allocation at one record's
+    worth of bytes rather than the whole document's. A compact `.jsonl`
+    sibling (one record per line, no indentation) is written alongside
+    the pretty file; the pipeline can reload that one line-by-line
+    without parsing the whole document.
+    """
+    with open(output_path, 'wb') as f:
+        f.write(b'[\n')
+        for i, record in enumerate(records):
+            if i:
+                f.write(b',\n')
+            f.write(_json_dumps_bytes(record))
+        f.write(b'\n]')
+
+    with open(Path(output_path).with_suffix('.jsonl'), 'wb') as f:
+        f.writelines(_jsonl_dumps(record) + b'\n' for record in records)
+
 
 class TranscriptFetcher:
     """Class to fetch specific call transcripts from the database and convert to JSON."""
@@ -15,7 +72,7 @@ class TranscriptFetcher:
     def __init__(self, db_folder="DB", db_name="retell.sqlite"):
         """Initialize with database connection."""
         # Setup database path
-        self.db_folder = Path(os.path.dirname(os.path.abspath(__file__))) / db_folder
+        self.db_folder = _MODULE_DIR / db_folder
         self.db_path = self.db_folder / db_name
         
         # Check if database exists
@@ -26,75 +83,89 @@ class TranscriptFetcher:
         self.output_dir = self.db_folder / "local_json"
         self.output_dir.mkdir(exist_ok=True)
         
-        # Connect to database
-        self.conn = sqlite3.connect(self.db_path)
+        # Connect to database (pooled; shared across instances)
+        self.conn = get_connection(self.db_path)
         self.cursor = self.conn.cursor()
-    
+
     def fetch_specific_calls(self, call_ids, output_filename="selected_transcripts.json"):
         """Fetch transcripts for specific call IDs and save to JSON."""
         # List to store call data
         call_data = []
-        
-        # Process each call ID
+        call_ids = list(call_ids)
+
+        # One query covers every requested transcript instead of a round
+        # trip per call ID
+        placeholders = ",".join("?" * len(call_ids))
+        self.cursor.execute(
+            f"SELECT call_id, transcript FROM calls WHERE call_id IN ({placeholders})",
+            call_ids)
+        transcripts = dict(self.cursor.fetchall())
+
+        # For calls with no stored transcript, reconstruct from
+        # utterances in SQL: one grouped group_concat query builds every
+        # missing transcript inside SQLite instead of shipping the rows
+        # out for Python to join
+        missing = [cid for cid in call_ids if transcripts.get(cid) is None]
+        reconstructed = {}
+        if missing:
+            placeholders = ",".join("?" * len(missing))
+            self.cursor.execute(f"""
+                SELECT call_id, count(*), group_concat(line, char(10))
+                FROM (
+                    SELECT call_id,
+                           (CASE WHEN lower(role) = 'agent' THEN 'Agent: ' ELSE 'User: ' END)
+                               || COALESCE(content, '') AS line
+                    FROM utterances
+                    WHERE call_id IN ({placeholders})
+                    ORDER BY call_id, utterance_index
+                )
+                GROUP BY call_id
+            """, missing)
+            reconstructed = {cid: (count, text) for cid, count, text in self.cursor.fetchall()}
+
         for call_id in call_ids:
             print(f"Processing call ID: {call_id}")
-            
-            # Try to fetch transcript from the database
-            self.cursor.execute("SELECT transcript FROM calls WHERE call_id = ?", (call_id,))
-            result = self.cursor.fetchone()
-            
-            if result and result[0] is not None:
-                transcript = result[0]
+
+            if transcripts.get(call_id) is not None:
+                transcript = transcripts[call_id]
                 call_data.append({
                     "call_id": call_id,
                     "transcript": transcript
                 })
                 print(f"  Found transcript ({len(transcript)} characters)")
+            elif call_id in reconstructed:
+                utterance_count, transcript = reconstructed[call_id]
+                call_data.append({
+                    "call_id": call_id,
+                    "transcript": transcript.strip()
+                })
+                print(f"  Reconstructed transcript from {utterance_count} utterances")
             else:
-                # If no transcript found, try to reconstruct from utterances
-                self.cursor.execute("""
-                    SELECT role, content FROM utterances 
-                    WHERE call_id = ? 
-                    ORDER BY utterance_index
-                """, (call_id,))
-                
-                utterances = self.cursor.fetchall()
-                
-                if utterances:
-                    # Reconstruct transcript from utterances
-                    transcript = ""
-                    for role, content in utterances:
-                        if content is None:
-                            content = ""
-                        role_display = "Agent" if role.lower() == "agent" else "User"
-                        transcript += f"{role_display}: {content}\n"
-                    
-                    call_data.append({
-                        "call_id": call_id,
-                        "transcript": transcript.strip()
-                    })
-                    print(f"  Reconstructed transcript from {len(utterances)} utterances")
-                else:
-                    # No data found for this call ID
-                    print(f"  No transcript found for {call_id}")
+                # No data found for this call ID
+                print(f"  No transcript found for {call_id}")
         
         # Write to JSON file
         output_path = self.output_dir / output_filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(call_data, f, indent=2, ensure_ascii=False)
+        _write_json_array(output_path, call_data)
         
         print(f"\nJSON file created successfully at {output_path}")
         print(f"Total calls processed: {len(call_data)}")
         
         return call_data, str(output_path)
     
-    def __del__(self):
-        """Cleanup database connection."""
-        if hasattr(self, 'conn') and self.conn:
-            self.conn.close()
+    def close(self):
+        """Release the pooled connection reference.
 
-    def __del__(self):
-        """Destructor to ensure database connection is closed."""
+        The connection itself stays open (and its page cache warm)
+        until process exit.
+        """
+        self.conn = None
+        self.cursor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
         self.close()
 
 
@@ -104,7 +175,7 @@ class RandomTranscriptFetcher:
     def __init__(self, db_folder="DB", db_name="retell.sqlite"):
         """Initialize with database connection."""
         # Setup database path
-        self.db_folder = Path(os.path.dirname(os.path.abspath(__file__))) / db_folder
+        self.db_folder = _MODULE_DIR / db_folder
         self.db_path = self.db_folder / db_name
         
         # Check if database exists
@@ -115,52 +186,40 @@ class RandomTranscriptFetcher:
         self.output_dir = self.db_folder / "local_json"
         self.output_dir.mkdir(exist_ok=True)
         
-        # Connect to database
-        self.conn = sqlite3.connect(self.db_path)
+        # Connect to database (pooled; shared across instances)
+        self.conn = get_connection(self.db_path)
         self.cursor = self.conn.cursor()
-    
+
     def fetch_random_calls(self, count=10, min_length=200, output_filename="random_transcripts.json"):
         """Fetch random call transcripts and save to JSON."""
-        # Get all call IDs with transcripts longer than min_length
+        # Let SQLite do the sampling: one ORDER BY RANDOM() LIMIT query
+        # replaces fetching every eligible row, sorting by length, and
+        # re-querying each sampled ID for its transcript
         self.cursor.execute("""
-            SELECT call_id, length(transcript) as transcript_length 
-            FROM calls 
-            WHERE length(transcript) > ? 
-            ORDER BY transcript_length DESC
-        """, (min_length,))
-        
-        eligible_calls = self.cursor.fetchall()
-        
-        if not eligible_calls:
+            SELECT call_id, transcript
+            FROM calls
+            WHERE length(transcript) > ?
+            ORDER BY RANDOM()
+            LIMIT ?
+        """, (min_length, count))
+
+        rows = self.cursor.fetchall()
+
+        if not rows:
             print(f"No calls found with transcript length > {min_length}")
             return [], ""
-        
-        print(f"Found {len(eligible_calls)} eligible calls")
-        
-        # Select random calls (up to count)
-        sample_size = min(count, len(eligible_calls))
-        selected_calls = random.sample(eligible_calls, sample_size)
-        
-        # Get call IDs from selected calls
-        selected_call_ids = [call[0] for call in selected_calls]
-        
-        # Fetch full transcripts for selected calls
+
         call_data = []
-        for call_id in selected_call_ids:
-            self.cursor.execute("SELECT transcript FROM calls WHERE call_id = ?", (call_id,))
-            result = self.cursor.fetchone()
-            
-            if result and result[0]:
-                call_data.append({
-                    "call_id": call_id,
-                    "transcript": result[0]
-                })
-                print(f"Selected call {call_id} with {len(result[0])} characters")
+        for call_id, transcript in rows:
+            call_data.append({
+                "call_id": call_id,
+                "transcript": transcript
+            })
+            print(f"Selected call {call_id} with {len(transcript)} characters")
         
         # Write to JSON file
         output_path = self.output_dir / output_filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(call_data, f, indent=2, ensure_ascii=False)
+        _write_json_array(output_path, call_data)
         
         print(f"\nJSON file created successfully at {output_path}")
         print(f"Total random calls selected: {len(call_data)}")
@@ -168,49 +227,58 @@ class RandomTranscriptFetcher:
         return call_data, str(output_path)
     
     def close(self):
-        """Close the database connection."""
-        if self.conn:
-            self.conn.close()
+        """Release the pooled connection reference."""
+        self.conn = None
+        self.cursor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 class QAPairGenerator:
     """Class to generate QA pairs from call transcripts using Gemini API."""
     
-    def __init__(self, db_folder="DB", db_name="retell.sqlite"):
-        """Initialize the QA generator with Gemini API and database connection."""
+    def __init__(self, db_folder="DB", db_name="retell.sqlite", conn=None):
+        """Initialize the QA generator with Gemini API and database connection.
+
+        An already-open connection can be injected via `conn` so callers
+        processing many transcripts (e.g. the Streamlit page) reuse one
+        warm connection instead of opening a new one per generator.
+        """
         # Load environment variables
         load_dotenv()
-        
+
         # Configure Gemini API
         self.api_key = os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
-        
+
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-2.0-pro-exp-02-05')
 
         # Setup database connection
-        self.db_folder = Path(os.path.dirname(os.path.abspath(__file__))) / db_folder
+        self.db_folder = _MODULE_DIR / db_folder
         self.db_path = self.db_folder / db_name
-        
-        # Check if database exists
-        if not os.path.exists(self.db_path):
-            raise FileNotFoundError(f"Database not found at {self.db_path}")
-        
-        # Connect to database
-        self.conn = sqlite3.connect(self.db_path)
+
+        if conn is not None:
+            # Borrowed connection: the caller owns its lifecycle
+            self.conn = conn
+        else:
+            # Check if database exists
+            if not os.path.exists(self.db_path):
+                raise FileNotFoundError(f"Database not found at {self.db_path}")
+
+            # Connect to database (pooled; shared across instances)
+            self.conn = get_connection(self.db_path)
         self.db = self.conn
         self.cursor = self.conn.cursor()
     
-    def generate_qa_pairs(self, transcript, call_id):
-        """Generate QA pairs from a transcript using Gemini."""
-        # Clean transcript by replacing placeholders and removing personal identifiers
-        cleaned_transcript = transcript.replace("[Customer's Name]", "Customer")
-        
-        prompt = f"""
-            Below is a transcript from a customer service call about ESA (Emotional Support Animal) letters from Wellness Wag.
-            Generate 5-8 question-answer pairs that simulate a NATURAL conversation between a customer and a Wellness Wag support agent.
-
+    # Instruction block shared by the single and batched prompts, so the
+    # ~1 KB preamble is written (and maintained) once
+    QA_INSTRUCTIONS = """
             WHAT I NEED:
             - Create question-answer pairs that sound like they come from REAL HUMAN CONVERSATIONS
             - Questions should be in NATURAL, CASUAL language - not perfect or formal
@@ -260,65 +328,214 @@ class QAPairGenerator:
             - "Typically, we process those within 24-48 hours, but I can double-check the exact timeframe for your state if you'd like."
             - "I'd be happy to look into that for you. If you'd like that specific information, you can give us a call at (415) 570-7864 or email us at hello@wellnesswag.com."
             - "While I don't have the exact figure in front of me, I can certainly find out for you if you'd like to know the precise amount. Would you like me to check that?"
+    """
 
+    # How many transcripts to fold into one batched Gemini request
+    BATCH_SIZE = 5
+
+    # Prompt halves around the transcript, assembled once at class
+    # definition so per-call prompt building is a two-string concat
+    # instead of re-interpolating the ~2 KB preamble every time
+    PROMPT_PREFIX = f"""
+            Below is a transcript from a customer service call about ESA (Emotional Support Animal) letters from Wellness Wag.
+            Generate 5-8 question-answer pairs that simulate a NATURAL conversation between a customer and a Wellness Wag support agent.
+            {QA_INSTRUCTIONS}
             Transcript:
-            {cleaned_transcript}
+            """
+
+    PROMPT_SUFFIX = """
 
             Format your response as a JSON array of objects, each with 'question' and 'answer' fields.
             Make the questions sound like they came from a real person on the phone, not from written text.
             If you cannot generate relevant questions from this transcript, return an empty array [].
         """
-        
-        # The rest of the function remains the same
+
+    @staticmethod
+    def _parse_json_bytes(data):
+        """Parse the widest JSON window in a response's bytes.
+
+        One regex scan replaces the fence-stripping string rewrites, and
+        the C parser handles the payload when orjson is installed.
+        """
+        m = _JSON_RE.search(bytes(data))
+        if m is None:
+            raise ValueError("No JSON payload found in Gemini response")
+        return _json_loads(m.group(0))
+
+    @classmethod
+    def _parse_response(cls, response):
+        """Extract the JSON payload from a Gemini response."""
+        if hasattr(response, 'text'):
+            response_text = response.text
+        else:
+            response_text = ''.join([part.text for part in response.parts])
+
+        return cls._parse_json_bytes(response_text.encode('utf-8'))
+
+    def _generate_parsed(self, prompt):
+        """Issue a streaming request and parse the accumulated payload.
+
+        Chunks are appended to a bytearray as they arrive, so the
+        transfer overlaps generation instead of waiting for the full
+        response before any bytes move.
+        """
+        buf = bytearray()
+        for chunk in self.model.generate_content(prompt, stream=True):
+            buf += chunk.text.encode('utf-8')
+        return self._parse_json_bytes(buf)
+
+    async def _generate_parsed_async(self, prompt):
+        """Async counterpart of _generate_parsed."""
+        buf = bytearray()
+        async for chunk in await self.model.generate_content_async(prompt, stream=True):
+            buf += chunk.text.encode('utf-8')
+        return self._parse_json_bytes(buf)
+
+    @staticmethod
+    def _postprocess_pairs(qa_pairs, call_id):
+        """Tag pairs with their call_id and normalize question/answer text."""
+        for qa in qa_pairs:
+            qa['call_id'] = call_id
+
+            # Ensure questions end with question marks
+            if not qa['question'].endswith('?'):
+                qa['question'] = qa['question'] + '?'
+
+            # Remove any markdown formatting from answers
+            qa['answer'] = qa['answer'].translate(_MD_STRIP)
+
+            # Ensure answers are complete sentences
+            if qa['answer'] and not qa['answer'].endswith(('.', '!', '?')):
+                qa['answer'] = qa['answer'] + '.'
+
+        return qa_pairs
+
+    def generate_qa_pairs(self, transcript, call_id):
+        """Generate QA pairs from a transcript using Gemini."""
+        # Clean transcript by replacing placeholders and removing personal identifiers
+        cleaned_transcript = transcript.replace("[Customer's Name]", "Customer")
+
+        prompt = self.PROMPT_PREFIX + cleaned_transcript + self.PROMPT_SUFFIX
+
         try:
-            response = self.model.generate_content(prompt)
-            
-            # Extract text from response
-            if hasattr(response, 'text'):
-                response_text = response.text
-            else:
-                response_text = ''.join([part.text for part in response.parts])
-            
-            # Clean up the response text to ensure it's valid JSON
-            response_text = response_text.replace('```json', '').replace('```', '').strip()
-            
-            # Parse the JSON
-            qa_pairs = json.loads(response_text)
-            
+            qa_pairs = self._generate_parsed(prompt)
+
             # If no relevant QA pairs could be generated, return empty list
             if not qa_pairs:
                 print(f"No relevant QA pairs could be generated for call {call_id}")
                 return []
-            
-            # Add call_id to each QA pair and ensure proper formatting
-            for qa in qa_pairs:
-                qa['call_id'] = call_id
-                
-                # Ensure questions end with question marks
-                if not qa['question'].endswith('?'):
-                    qa['question'] = qa['question'] + '?'
-                
-                # Remove any markdown formatting from answers
-                qa['answer'] = qa['answer'].replace('**', '').replace('*', '').replace('_', '')
-                
-                # Ensure answers are complete sentences
-                if qa['answer'] and not qa['answer'].endswith(('.', '!', '?')):
-                    qa['answer'] = qa['answer'] + '.'
-                
-            return qa_pairs
-            
+
+            return self._postprocess_pairs(qa_pairs, call_id)
+
         except Exception as e:
             print(f"Error generating QA pairs for call {call_id}: {e}")
             # Return empty list instead of fallback QA pair
             return []
-    
+
+    def _build_batch_prompt(self, batch):
+        """Build one prompt covering every (call_id, transcript) in batch."""
+        cleaned = [(call_id, transcript.replace("[Customer's Name]", "Customer"))
+                   for call_id, transcript in batch]
+        blocks = "\n".join(
+            f"<<<CALL {call_id}>>>\n{transcript}\n<<<END>>>"
+            for call_id, transcript in cleaned
+        )
+
+        return f"""
+            Below are {len(batch)} transcripts from customer service calls about ESA (Emotional Support Animal) letters from Wellness Wag,
+            each delimited by <<<CALL call_id>>> and <<<END>>> markers.
+            For EACH transcript, generate 5-8 question-answer pairs that simulate a NATURAL conversation between a customer and a Wellness Wag support agent.
+            {self.QA_INSTRUCTIONS}
+            Transcripts:
+            {blocks}
+
+            Format your response as a single JSON object mapping each call_id to an array of objects with 'question' and 'answer' fields.
+            Make the questions sound like they came from a real person on the phone, not from written text.
+            If you cannot generate relevant questions for a transcript, map its call_id to an empty array [].
+        """
+
+    def _collect_batch_results(self, batch, by_call):
+        """Fan a parsed batch response back out into per-call pair lists."""
+        results = {}
+        for call_id, _ in batch:
+            qa_pairs = by_call.get(call_id) or []
+            if not qa_pairs:
+                print(f"No relevant QA pairs could be generated for call {call_id}")
+            results[call_id] = self._postprocess_pairs(qa_pairs, call_id)
+        return results
+
+    def generate_qa_pairs_batch(self, batch):
+        """Generate QA pairs for several transcripts with one Gemini request.
+
+        Folding a handful of transcripts into a single prompt collapses
+        their network round trips and repeats the instruction preamble
+        once instead of per call.
+
+        Args:
+            batch: List of (call_id, transcript) tuples
+
+        Returns:
+            Dict mapping call_id -> list of postprocessed QA pairs
+        """
+        try:
+            by_call = self._generate_parsed(self._build_batch_prompt(batch))
+            # Collect inside the try: a reply shaped as a bare array
+            # raises from by_call.get and should hit the same error path
+            # as any other bad response, like the async variant does
+            return self._collect_batch_results(batch, by_call)
+        except Exception as e:
+            ids = ", ".join(call_id for call_id, _ in batch)
+            print(f"Error generating QA pairs for calls {ids}: {e}")
+            return {call_id: [] for call_id, _ in batch}
+
+    async def _generate_batch_async(self, batch, semaphore, max_attempts=3):
+        """Async variant of generate_qa_pairs_batch with backoff on 429s."""
+        prompt = self._build_batch_prompt(batch)
+        async with semaphore:
+            for attempt in range(max_attempts):
+                try:
+                    by_call = await self._generate_parsed_async(prompt)
+                    return self._collect_batch_results(batch, by_call)
+                except Exception as e:
+                    # Back off exponentially on rate limits; give up on
+                    # anything else (or once attempts run out)
+                    if '429' in str(e) and attempt < max_attempts - 1:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+                    ids = ", ".join(call_id for call_id, _ in batch)
+                    print(f"Error generating QA pairs for calls {ids}: {e}")
+                    return {call_id: [] for call_id, _ in batch}
+
+    def _generate_all_batches(self, batches, concurrency=8):
+        """Run the batched requests concurrently under one event loop.
+
+        Each batch is independent, so a Semaphore-bounded gather overlaps
+        up to `concurrency` HTTP requests instead of waiting out each
+        round trip in sequence.
+        """
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await tqdm_asyncio.gather(
+                *[self._generate_batch_async(batch, semaphore) for batch in batches],
+                desc="Generating QA pairs"
+            )
+
+        return asyncio.run(run())
+
+
     def process_transcripts(self, transcripts_data, output_filename="qa_pairs.json"):
         """Process transcripts and generate QA pairs."""
         # Check if transcripts_data is a file path or a list
         if isinstance(transcripts_data, str):
-            # Load transcripts from file
-            with open(transcripts_data, 'r', encoding='utf-8') as f:
-                transcripts = json.load(f)
+            if transcripts_data.endswith('.jsonl'):
+                # Compact sibling format: parse one record per line
+                # instead of materializing the whole document at once
+                with open(transcripts_data, 'rb') as f:
+                    transcripts = [_json_loads(line) for line in f if line.strip()]
+            else:
+                # Load transcripts from file
+                with open(transcripts_data, 'r', encoding='utf-8') as f:
+                    transcripts = json.load(f)
         else:
             # Use provided list
             transcripts = transcripts_data
@@ -329,34 +546,35 @@ class QAPairGenerator:
         processed_count = 0
         skipped_count = 0
         empty_result_count = 0
-        
-        # Process each transcript with progress bar
-        for call_data in tqdm(transcripts, desc="Generating QA pairs"):
+
+        # Filter out empty or very short transcripts up front
+        eligible = []
+        for call_data in transcripts:
             call_id = call_data["call_id"]
             transcript = call_data["transcript"]
-            
-            # Skip empty or very short transcripts
             if not transcript or len(transcript) < 50:
                 print(f"Skipping call {call_id} - transcript too short")
                 skipped_count += 1
-                continue
-                
-            # Generate QA pairs
-            qa_pairs = self.generate_qa_pairs(transcript, call_id)
-            
-            if qa_pairs:
-                all_qa_pairs.extend(qa_pairs)
-                processed_count += 1
             else:
-                empty_result_count += 1
-            
-            # Add a small delay to avoid rate limiting
-            time.sleep(1)
+                eligible.append((call_id, transcript))
+
+        # Process transcripts in batches: one Gemini request covers
+        # BATCH_SIZE calls, and the batches themselves run concurrently
+        # so the total wall time is bounded by the slowest requests, not
+        # their sum
+        batches = [eligible[i:i + self.BATCH_SIZE]
+                   for i in range(0, len(eligible), self.BATCH_SIZE)]
+        for batch_results in self._generate_all_batches(batches):
+            for call_id, qa_pairs in batch_results.items():
+                if qa_pairs:
+                    all_qa_pairs.extend(qa_pairs)
+                    processed_count += 1
+                else:
+                    empty_result_count += 1
         
         # Save all QA pairs to a JSON file
         output_path = self.output_dir / output_filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(all_qa_pairs, f, indent=2, ensure_ascii=False)
+        _write_json_array(output_path, all_qa_pairs)
         
         print(f"\nGenerated {len(all_qa_pairs)} QA pairs from {processed_count} transcripts")
         print(f"Skipped {skipped_count} transcripts (too short)")
@@ -373,6 +591,24 @@ class QAPairGenerator:
         
         return all_qa_pairs, str(output_path)
 
+    def persist_qa_pairs(self, qa_pairs):
+        """Insert generated pairs into the qa_pairs table in one transaction.
+
+        executemany under a single `with self.conn:` block pays one
+        commit (and, with WAL + synchronous=NORMAL, one fsync) per batch
+        instead of one per row.
+        """
+        with self.conn:
+            self.cursor.executemany(
+                "INSERT INTO qa_pairs (call_id, question, answer) VALUES (?, ?, ?)",
+                [(qa['call_id'], qa['question'], qa['answer']) for qa in qa_pairs])
+        return len(qa_pairs)
+
+    def close(self):
+        """Release the connection reference; pooled connections stay open."""
+        self.conn = None
+        self.cursor = None
+
 
 def main():
     """Main function to run the QA generation process."""
@@ -395,24 +631,18 @@ def main():
             print("Error: --call_ids is required for specific mode")
             return
         
-        fetcher = TranscriptFetcher()
-        try:
+        with TranscriptFetcher() as fetcher:
             transcripts, transcripts_file = fetcher.fetch_specific_calls(
-                args.call_ids, 
+                args.call_ids,
                 output_filename="selected_transcripts.json"
             )
-        finally:
-            fetcher.close()
     
     elif args.mode == "random":
-        fetcher = RandomTranscriptFetcher()
-        try:
+        with RandomTranscriptFetcher() as fetcher:
             transcripts, transcripts_file = fetcher.fetch_random_calls(
                 count=args.count,
                 output_filename="random_transcripts.json"
             )
-        finally:
-            fetcher.close()
     
     elif args.mode == "file":
         if not args.input_file:
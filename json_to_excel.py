@@ -5,8 +5,22 @@
 import os
 import json
 import argparse
+import itertools
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from tqdm import tqdm
+
+# Prefer orjson's SIMD-accelerated parser; fall back to stdlib json
+try:
+    import orjson
+
+    def _json_loads_file(path):
+        return orjson.loads(Path(path).read_bytes())
+except ImportError:
+    def _json_loads_file(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
 
 def convert_json_to_excel(json_file_path, excel_file_path=None):
     """
@@ -25,39 +39,46 @@ def convert_json_to_excel(json_file_path, excel_file_path=None):
         excel_file_path = os.path.splitext(json_file_path)[0] + '.xlsx'
     
     # Load JSON data
-    with open(json_file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = _json_loads_file(json_file_path)
     
     # Check if data is a list
     if not isinstance(data, list):
         # If data is a dictionary with sections, flatten it
         if isinstance(data, dict):
-            flattened_data = []
-            for section, qa_pairs in data.items():
-                if isinstance(qa_pairs, list):
-                    flattened_data.extend(qa_pairs)
-            data = flattened_data
+            data = list(itertools.chain.from_iterable(
+                qa_pairs for qa_pairs in data.values() if isinstance(qa_pairs, list)
+            ))
         else:
             raise ValueError("JSON data must be a list of QA pairs or a dictionary of sections with QA pairs")
-    
-    # Extract questions and answers
-    qa_pairs = []
-    for item in data:
-        if "question" in item and "answer" in item:
-            qa_pairs.append({
-                "Question": item["question"],
-                "Answer": item["answer"]
-            })
-    
-    # Create DataFrame
-    df = pd.DataFrame(qa_pairs)
-    
-    # Save to Excel
-    df.to_excel(excel_file_path, index=False)
-    
-    print(f"Converted {len(qa_pairs)} QA pairs to Excel file: {excel_file_path}")
+
+    # Build the frame columnar via json_normalize instead of a Python loop,
+    # keeping only rows that have both a question and an answer
+    df = pd.json_normalize(data)
+    if "question" in df.columns and "answer" in df.columns:
+        df = (df[["question", "answer"]]
+              .dropna(subset=["question", "answer"])
+              .rename(columns={"question": "Question", "answer": "Answer"}))
+    else:
+        df = pd.DataFrame(columns=["Question", "Answer"])
+
+    # Save to Excel with xlsxwriter in constant_memory mode so the sheet is
+    # serialized row-at-a-time instead of held fully in memory
+    with pd.ExcelWriter(excel_file_path, engine="xlsxwriter",
+                        engine_kwargs={"options": {"constant_memory": True}}) as writer:
+        df.to_excel(writer, index=False)
+
+    print(f"Converted {len(df)} QA pairs to Excel file: {excel_file_path}")
     return excel_file_path
 
+def _convert_one(args):
+    """Worker wrapper so file conversions can run in a process pool."""
+    json_file, output_file = args
+    try:
+        convert_json_to_excel(json_file, output_file)
+    except Exception as e:
+        print(f"Error processing {json_file}: {e}")
+
+
 def process_directory(input_dir, output_dir=None):
     """
     Process all JSON files in a directory and convert them to Excel.
@@ -83,14 +104,15 @@ def process_directory(input_dir, output_dir=None):
         return
     
     print(f"Found {len(json_files)} JSON files to process")
-    
-    # Process each file
-    for json_file in json_files:
-        output_file = output_path / f"{json_file.stem}.xlsx"
-        try:
-            convert_json_to_excel(str(json_file), str(output_file))
-        except Exception as e:
-            print(f"Error processing {json_file}: {e}")
+
+    # Each file is independent, so fan conversions out across a process pool
+    jobs = [(str(f), str(output_path / f"{f.stem}.xlsx")) for f in json_files]
+    if len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(tqdm(executor.map(_convert_one, jobs),
+                      total=len(jobs), desc="Converting JSON files"))
+    else:
+        _convert_one(jobs[0])
 
 def main():
     parser = argparse.ArgumentParser(description="Convert JSON QA pairs to Excel files")
@@ -87,38 +87,52 @@ Use the sidebar to navigate between different pages of the application:
 """)
 
 # Display information about the database
-db_folder = Path(os.path.dirname(os.path.abspath(__file__))) / "DB"
+_MODULE_DIR = Path(__file__).resolve().parent
+db_folder = _MODULE_DIR / "DB"
 db_path = db_folder / "retell.sqlite"
 
 # Database status
 st.subheader("Database Status")
 
 # Initialize database path
-db_folder = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) / "DB"
+db_folder = _MODULE_DIR.parent / "DB"
 db_path = db_folder / "retell.sqlite"
 
+
+@st.cache_data(ttl=30)
+def get_db_stats(db_path_str):
+    """Fetch call/utterance/QA counts with one query, cached across reruns.
+
+    Streamlit reruns this script on every widget change; the cache keeps
+    sidebar keypresses from re-querying the database each time. Counts
+    come from the trigger-maintained counters table (with MAX(id) for
+    utterances), so the query is O(1) rather than a scan per table;
+    older databases without the counters table fall back to COUNT(*).
+    """
+    import sqlite3
+    from create_db import get_connection
+    conn = get_connection(db_path_str)
+    try:
+        return conn.execute("""
+            SELECT (SELECT n FROM counters WHERE name = 'calls'),
+                   (SELECT COALESCE(MAX(id), 0) FROM utterances),
+                   (SELECT n FROM counters WHERE name = 'qa_pairs')
+        """).fetchone()
+    except sqlite3.OperationalError:
+        return conn.execute("""
+            SELECT (SELECT COUNT(*) FROM calls),
+                   (SELECT COUNT(*) FROM utterances),
+                   (SELECT COUNT(*) FROM qa_pairs)
+        """).fetchone()
+
 # Database status
 if db_path.exists():
     st.success(f"✅ Database found at {db_path}")
     
     # Try to connect and get some stats
     try:
-        import sqlite3
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Get call count
-        cursor.execute("SELECT COUNT(*) FROM calls")
-        call_count = cursor.fetchone()[0]
-        
-        # Get utterance count
-        cursor.execute("SELECT COUNT(*) FROM utterances")
-        utterance_count = cursor.fetchone()[0]
-        
-        # Get QA pair count
-        cursor.execute("SELECT COUNT(*) FROM qa_pairs")
-        qa_count = cursor.fetchone()[0]
-        
+        call_count, utterance_count, qa_count = get_db_stats(str(db_path))
+
         # Display stats in columns
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -127,8 +141,6 @@ if db_path.exists():
             st.metric("Total Utterances", utterance_count)
         with col3:
             st.metric("Total QA Pairs", qa_count)
-            
-        conn.close()
     except Exception as e:
         st.warning(f"Connected to database but couldn't fetch stats: {str(e)}")
         
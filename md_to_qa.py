@@ -1,285 +1,795 @@
 import os
 import json
 import re
+import asyncio
+import datetime
+import hashlib
+import mmap
+import random
+import sqlite3
+import textwrap
+import threading
 import time
 from pathlib import Path
-from tqdm import tqdm
-from dotenv import load_dotenv
-import google.generativeai as genai
+
+MODEL_NAME = 'gemini-1.5-flash'
+
+# Bump whenever the prompt templates change so stale cached responses miss
+PROMPT_VERSION = "1"
+
+# Prefer orjson (C serializer emitting utf-8 bytes); fall back to stdlib json
+try:
+    import orjson
+
+    def _json_dumps_bytes(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _jsonl_dumps(obj):
+        return orjson.dumps(obj) + b'\n'
+except ImportError:
+    def _json_dumps_bytes(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+    def _jsonl_dumps(obj):
+        return (json.dumps(obj, ensure_ascii=False) + '\n').encode('utf-8')
+
+    def _json_loads(data):
+        return json.loads(data)
+
+# Patterns compiled once at import so the hot extraction loops skip re's
+# per-call parse and cache lookup (and survive _MAXCACHE eviction)
+_WS_RE = re.compile(r'\s+')
+# Byte pattern: section headers are matched directly against the mmap'd
+# file, so only the final section slices are ever decoded
+_SECTION_RE = re.compile(rb'(^|\n)#{1,3}\s+(.*?)(?=\n)')
+_QA_RE = re.compile(r'Q:\s*(.*?)\s*\n\s*A:\s*(.*?)(?=\n\s*Q:|$)', re.DOTALL)
+# Matches only the state mention itself; each state's span of content
+# is derived by pairing consecutive match starts, so the regex never
+# backtracks through the section body (the old `.*?` + lookahead form
+# rescanned the tail of the content once per state)
+_STATE_MARKER_RE = re.compile(
+    r'(?:in|for)\s+([A-Z][a-z]+)(?:,|\s+Law|\s+[A-Z]{2}-\d+)')
+
+
+# Transient Gemini failures worth retrying; matched by exception class
+# name (ResourceExhausted etc. come from google.api_core, which we avoid
+# importing directly) or by the status code embedded in the message
+_RETRYABLE_NAMES = frozenset(
+    ('ResourceExhausted', 'ServiceUnavailable', 'InternalServerError',
+     'DeadlineExceeded'))
+_MAX_ATTEMPTS = 5
+
+
+def _is_retryable(exc):
+    """True for rate limits and transient server errors."""
+    if type(exc).__name__ in _RETRYABLE_NAMES:
+        return True
+    text = str(exc)
+    return '429' in text or '500' in text or '503' in text
+
+
+def _backoff_delay(attempt):
+    """Exponential backoff with jitter, capped at 30s."""
+    return min(30.0, 2.0 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def _normalize(text):
+    """Lowercase and collapse whitespace so formatting-only edits still hit."""
+    return _WS_RE.sub(' ', text.lower()).strip()
+
+
+def parse_llm_json(text):
+    """Extract the first JSON value from model output, tolerating prose.
+
+    Replies are sometimes wrapped in code fences or explanatory text;
+    failing to parse those used to raise and route a perfectly good
+    response into the fallback path, discarding the generation and
+    costing another call. Decoding from each bracket position with
+    raw_decode accepts any reply that contains valid JSON anywhere.
+    """
+    # Fast path: the reply is already bare JSON
+    try:
+        return _json_loads(text)
+    except Exception:
+        pass
+
+    # Strip code fences and retry before scanning for an embedded value
+    cleaned = text.replace('```json', '').replace('```', '').strip()
+    try:
+        return _json_loads(cleaned)
+    except Exception:
+        pass
+
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r'[\[{]', cleaned):
+        try:
+            value, _ = decoder.raw_decode(cleaned, match.start())
+            return value
+        except ValueError:
+            continue
+    raise ValueError("no JSON value found in model response")
+
+
+class ResponseCache:
+    """SQLite-backed cache of parsed Gemini responses.
+
+    Keyed by sha256(model|prompt_version|normalized content), so reruns
+    over the same markdown (the usual debug loop) skip the LLM entirely.
+    """
+
+    def __init__(self, cache_path):
+        self.conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key BLOB PRIMARY KEY,
+                response TEXT,
+                ts INTEGER
+            )
+        ''')
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(content):
+        return hashlib.sha256(
+            f"{MODEL_NAME}|{PROMPT_VERSION}|{_normalize(content)}".encode('utf-8')).digest()
+
+    def get(self, key):
+        row = self.conn.execute(
+            "SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return _json_loads(row[0]) if row else None
+
+    def put(self, key, parsed):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, ts) "
+                "VALUES (?, ?, strftime('%s', 'now'))",
+                (key, json.dumps(parsed, ensure_ascii=False)))
+
+
+# Process-wide Gemini model, built once on first use. Each
+# GenerativeModel construction re-reads .env and re-runs the SDK's
+# configuration, so every generator instance (and any worker thread)
+# shares this single client and its underlying HTTP session.
+_model_lock = threading.Lock()
+_model = None
+
+
+def get_model():
+    """Return the shared GenerativeModel, building it under a lock."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            # Imported here rather than at module top so CLI startup
+            # (and --help) doesn't pay for the SDK import
+            from dotenv import load_dotenv
+            import google.generativeai as genai
+
+            load_dotenv()
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY not found in environment variables")
+            genai.configure(api_key=api_key)
+            _model = genai.GenerativeModel(MODEL_NAME)
+        return _model
+
 
 class MDQAPairGenerator:
     """Class to generate QA pairs from markdown files using Gemini API."""
-    
-    def __init__(self):
+
+    def __init__(self, use_cache=True, min_existing_qa=5, tier="standard"):
         """Initialize the QA generator with Gemini API."""
-        # Load environment variables
-        load_dotenv()
-        
-        # Configure Gemini API
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-        
+        self.model = get_model()
+
+        # Sections whose content already carries at least this many Q:/A:
+        # pairs skip the Gemini call entirely; 0 disables the skip
+        self.min_existing_qa = min_existing_qa
+
+        # Offline generation doesn't care about latency, so a discounted
+        # sheddable tier is requested when one is asked for. The option
+        # rides in request_options; _call_model drops it (once) if the
+        # installed SDK predates tier support.
+        self._gen_kwargs = (
+            {"request_options": {"service_tier": tier}}
+            if tier and tier != "standard" else {})
+
         # Create output directory if it doesn't exist
         self.output_dir = Path(os.path.dirname(os.path.abspath(__file__))) / "DB" / "local_json"
         self.output_dir.mkdir(exist_ok=True, parents=True)
+
+        # Local response cache so repeated runs over the same sections
+        # don't re-pay Gemini latency and tokens
+        self.cache = ResponseCache(self.output_dir / ".qa_cache.sqlite") if use_cache else None
+
+        # Register the static prompt scaffolding with Gemini's explicit
+        # context cache when the backend allows it, so the preamble is
+        # processed (and billed) once instead of per section. Models
+        # enforce a minimum cacheable size, so fall back to inlining the
+        # prefix when creation is refused.
+        self.cached_model = None
+        try:
+            import google.generativeai as genai
+            from google.generativeai import caching
+            cached = caching.CachedContent.create(
+                model=f"models/{MODEL_NAME}",
+                contents=[self.STATIC_PREFIX],
+                ttl=datetime.timedelta(hours=1),
+            )
+            self.cached_model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+        except Exception as e:
+            print(f"Context caching unavailable ({e}); inlining the prompt prefix")
     
     def extract_sections(self, md_file_path):
         """Extract sections from a markdown file."""
-        with open(md_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Find all section headers (lines starting with # or ##)
-        section_pattern = r'(^|\n)#{1,3}\s+(.*?)(?=\n)'
-        section_matches = re.finditer(section_pattern, content)
-        
-        sections = []
-        last_pos = 0
-        
-        # Extract sections and their positions
-        for match in section_matches:
-            section_title = match.group(2).strip()
-            start_pos = match.start()
-            
-            # Add previous section if it exists
-            if sections and last_pos < start_pos:
-                sections[-1]['end_pos'] = start_pos
-                sections[-1]['content'] = content[sections[-1]['start_pos']:sections[-1]['end_pos']]
-            
-            # Add current section
-            sections.append({
-                'title': section_title,
-                'start_pos': start_pos,
-                'end_pos': len(content)  # Will be updated in next iteration
-            })
-            
-            last_pos = start_pos
-        
-        # Add content to the last section
-        if sections:
-            sections[-1]['content'] = content[sections[-1]['start_pos']:sections[-1]['end_pos']]
-        
-        return sections
+        if os.path.getsize(md_file_path) == 0:
+            return []
+
+        # Scan the mmap'd bytes in place: the OS page cache backs the
+        # buffer, so there's no full-file str copy and no up-front UTF-8
+        # decode of content that regex scanning never needed. Headers
+        # (lines starting with # to ###) are paired with the next
+        # header's start (or EOF) and only the final slices are decoded.
+        with open(md_file_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            matches = list(_SECTION_RE.finditer(mm))
+            starts = [match.start() for match in matches]
+            ends = starts[1:] + [len(mm)]
+
+            return [{'title': match.group(2).decode('utf-8').strip(),
+                     'content': mm[start:end].decode('utf-8')}
+                    for match, start, end in zip(matches, starts, ends)]
     
     def extract_existing_qa_pairs(self, section_content):
         """Extract existing QA pairs from section content."""
-        # Extract existing QA pairs
-        existing_qa_pattern = r'Q:\s*(.*?)\s*\n\s*A:\s*(.*?)(?=\n\s*Q:|$)'
-        existing_qa_matches = re.findall(existing_qa_pattern, section_content, re.DOTALL)
-        
-        existing_qa_pairs = []
-        for q, a in existing_qa_matches:
-            existing_qa_pairs.append({
-                "question": q.strip(),
-                "answer": a.strip()
-            })
-        
-        return existing_qa_pairs
+        # finditer builds the final dicts in one pass, skipping the
+        # intermediate tuple list findall would allocate
+        return [{"question": match.group(1).strip(), "answer": match.group(2).strip()}
+                for match in _QA_RE.finditer(section_content)]
     
     def generate_state_specific_qa_pairs(self, section_content, section_title):
         """Generate state-specific QA pairs for laws and requirements."""
         # Check if this is a section about laws or state requirements
         if "law" in section_title.lower() or "state" in section_title.lower():
-            # Extract state names and their requirements
-            state_pattern = r'(?:in|for)\s+([A-Z][a-z]+)(?:,|\s+Law|\s+[A-Z]{2}-\d+)'
-            state_matches = re.finditer(state_pattern, section_content)
-            
-            states = []
-            for match in state_matches:
-                state = match.group(1)
-                if state not in states and state not in ["Law", "ESA"]:
-                    states.append(state)
-            
-            # Generate QA pairs for each state
+            # One linear pass collects every state mention and its
+            # offset; each state's content is the slice from its match
+            # up to the next state's match (or end of section)
+            markers = [(m.group(1), m.start())
+                       for m in _STATE_MARKER_RE.finditer(section_content)]
+            markers.append((None, len(section_content)))
+
             state_qa_pairs = []
-            for state in states:
-                # Find content related to this state
-                state_content_pattern = r'(?:in|for)\s+' + state + r'(?:,|\s+Law|\s+[A-Z]{2}-\d+).*?(?=(?:in|for)\s+[A-Z][a-z]+(?:,|\s+Law|\s+[A-Z]{2}-\d+)|$)'
-                state_content_match = re.search(state_content_pattern, section_content, re.DOTALL)
-                
-                if state_content_match:
-                    state_content = state_content_match.group(0)
-                    
-                    # Create a QA pair for this state
-                    state_qa_pairs.append({
-                        "question": f"What are the requirements for obtaining an ESA letter in {state}?",
-                        "answer": f"In {state}, {state_content.strip()}",
-                        "section": section_title,
-                        "state": state
-                    })
-            
+            seen_states = set()
+            for (state, start), (_, end) in zip(markers, markers[1:]):
+                if state in seen_states or state in ("Law", "ESA"):
+                    continue
+                seen_states.add(state)
+
+                # Create a QA pair for this state
+                state_qa_pairs.append({
+                    "question": f"What are the requirements for obtaining an ESA letter in {state}?",
+                    "answer": f"In {state}, {section_content[start:end].strip()}",
+                    "section": section_title,
+                    "state": state
+                })
+
             return state_qa_pairs
-        
+
         return []
     
-    def generate_qa_pairs_for_section(self, section):
-        """Generate QA pairs for a section using Gemini."""
-        section_title = section['title']
-        section_content = section['content']
-        
-        # Extract existing QA pairs
-        existing_qa_pairs = self.extract_existing_qa_pairs(section_content)
-        
-        # Generate state-specific QA pairs if applicable
-        state_qa_pairs = self.generate_state_specific_qa_pairs(section_content, section_title)
-        
-        # If there are existing QA pairs, use them as examples
-        examples = ""
-        if existing_qa_pairs:
-            examples = "Here are some example QA pairs from the content:\n"
-            for i, qa in enumerate(existing_qa_pairs[:3]):  # Use up to 3 examples
-                examples += f"Example {i+1}:\nQ: {qa['question']}\nA: {qa['answer']}\n\n"
-        
-        prompt = f"""
-        Below is content from a section titled "{section_title}" about ESA (Emotional Support Animal) letters from Wellness Wag. 
-        Generate 5-8 meaningful question-answer pairs that could be used to train a customer support chatbot.
-        
-        {examples}
-        
+    # Instruction block shared by the single-section and batched prompts
+    # Dedented once at class creation: the 8-space literal indentation
+    # would otherwise ride along on every line of every request, costing
+    # tokens and perturbing the prefix Gemini's implicit cache keys on
+    PROMPT_GUIDELINES = textwrap.dedent("""\
         Focus on:
         1. Create a separate question for EACH specific piece of information in the content
         2. If there are multiple states mentioned, create a separate question for EACH state
         3. If there are specific laws or requirements mentioned, create questions about those specific details
         4. Use simple, direct language that customers would actually use
         5. Make sure answers are comprehensive and include all relevant details
-        
+
         Important guidelines:
         - DO NOT use placeholders like [state] or [requirement] - fill in the actual information
         - Include specific information like prices, timeframes, and requirements when mentioned
         - Make the questions sound like real customer inquiries
         - Ensure answers are accurate based on the provided content
         - If the section mentions specific states (Arkansas, California, Iowa, Louisiana, Montana), create separate questions for each state
-        
-        Section Content:
-        {section_content}
-        
+    """).strip()
+
+    # Static scaffolding for the single-section prompt. Dedented and kept
+    # first and byte-identical across calls so it can be registered with
+    # Gemini's explicit context cache (and hit the implicit prefix cache
+    # otherwise); the per-section tail is appended after it.
+    STATIC_PREFIX = textwrap.dedent("""\
+        You will be given content from a section of documentation about ESA (Emotional Support Animal) letters from Wellness Wag.
+        Generate 5-8 meaningful question-answer pairs that could be used to train a customer support chatbot.
+        {guidelines}
         Format your response as a JSON array of objects, each with 'question' and 'answer' fields.
         Example:
         [
             {{"question": "What is the requirement in Arkansas for obtaining an ESA letter?", "answer": "In Arkansas, Law HB1420 requires a 30-day relationship with a licensed mental health professional before issuing an ESA letter. Our process makes this easy: after you register, a licensed Arkansas physician will give you an initial call to gather some basic information and start the relationship. After 30 days, the same physician will follow up to ensure everything is in order and then issue your ESA letter."}},
             {{"question": "How does the ESA letter process work in California?", "answer": "California Law AB-468 mandates a 30-day relationship with a licensed mental health professional before an ESA letter can be provided. Once you register for an ESA letter, a licensed California physician will reach out for an introductory call to begin the relationship. After 30 days, they will follow up, confirm everything is on track, and issue your ESA letter."}}
         ]
-        """
-        
+    """).format(guidelines=PROMPT_GUIDELINES)
+
+    # How many sections to fold into one batched Gemini request
+    BATCH_SIZE = 5
+
+    # Batched-request scaffolding; instructions lead and the variable
+    # section blocks trail so requests share a stable prompt prefix
+    BATCH_PROMPT_TEMPLATE = textwrap.dedent("""\
+        Below are {count} sections from documentation about ESA (Emotional Support Animal) letters from Wellness Wag,
+        each delimited by <<<SECTION sec_i: title>>> and <<<END>>> markers.
+        For EACH section, generate 5-8 meaningful question-answer pairs that could be used to train a customer support chatbot.
+        {guidelines}
+        Format your response as a single JSON object mapping each section key (e.g. "sec_0") to an array of objects with 'question' and 'answer' fields.
+        If you cannot generate relevant questions for a section, map its key to an empty array [].
+
+        Sections:
+        {blocks}
+        """)
+
+    @staticmethod
+    def _parse_response(response):
+        """Extract the JSON payload from a Gemini response."""
+        if hasattr(response, 'text'):
+            response_text = response.text
+        else:
+            response_text = ''.join([part.text for part in response.parts])
+
+        return parse_llm_json(response_text)
+
+    def _call_model(self, model, prompt):
+        """generate_content with the configured tier, shedding it if unsupported."""
         try:
-            response = self.model.generate_content(prompt)
-            
-            # Extract text from response
-            if hasattr(response, 'text'):
-                response_text = response.text
-            else:
-                response_text = ''.join([part.text for part in response.parts])
-            
-            # Clean up the response text to ensure it's valid JSON
-            response_text = response_text.replace('```json', '').replace('```', '').strip()
-            
-            # Parse the JSON
-            qa_pairs = json.loads(response_text)
-            
-            # Add section to each QA pair
-            for qa in qa_pairs:
+            return model.generate_content(prompt, **self._gen_kwargs)
+        except TypeError:
+            if not self._gen_kwargs:
+                raise
+            print("Service tier not supported by this SDK; using the default tier")
+            self._gen_kwargs = {}
+            return model.generate_content(prompt)
+
+    async def _call_model_async(self, model, prompt):
+        """Async counterpart of _call_model."""
+        try:
+            return await model.generate_content_async(prompt, **self._gen_kwargs)
+        except TypeError:
+            if not self._gen_kwargs:
+                raise
+            print("Service tier not supported by this SDK; using the default tier")
+            self._gen_kwargs = {}
+            return await model.generate_content_async(prompt)
+
+    def _generate_parsed(self, cache_content, prompt, model=None):
+        """Generate and parse a response, consulting the local cache first."""
+        model = model or self.model
+        key = None
+        if self.cache is not None:
+            key = ResponseCache.make_key(cache_content)
+            hit = self.cache.get(key)
+            if hit is not None:
+                return hit
+        for attempt in range(_MAX_ATTEMPTS):
+            try:
+                parsed = self._parse_response(self._call_model(model, prompt))
+                break
+            except Exception as e:
+                # Only retry rate limits and transient server errors;
+                # genuine failures should surface immediately
+                if _is_retryable(e) and attempt < _MAX_ATTEMPTS - 1:
+                    time.sleep(_backoff_delay(attempt))
+                    continue
+                raise
+        if key is not None:
+            self.cache.put(key, parsed)
+        return parsed
+
+    async def _generate_parsed_async(self, cache_content, prompt, model=None):
+        """Async counterpart of _generate_parsed."""
+        model = model or self.model
+        key = None
+        if self.cache is not None:
+            key = ResponseCache.make_key(cache_content)
+            hit = self.cache.get(key)
+            if hit is not None:
+                return hit
+        for attempt in range(_MAX_ATTEMPTS):
+            try:
+                parsed = self._parse_response(await self._call_model_async(model, prompt))
+                break
+            except Exception as e:
+                if _is_retryable(e) and attempt < _MAX_ATTEMPTS - 1:
+                    # asyncio.sleep yields the loop, so peer sections
+                    # keep running while this one backs off
+                    await asyncio.sleep(_backoff_delay(attempt))
+                    continue
+                raise
+        if key is not None:
+            self.cache.put(key, parsed)
+        return parsed
+
+    def _section_request(self, section, existing_qa_pairs):
+        """Model and prompt for one section, honoring the context cache."""
+        tail = self._build_section_prompt(section, existing_qa_pairs)
+        if self.cached_model is not None:
+            return self.cached_model, tail
+        return self.model, self.STATIC_PREFIX + tail
+
+    def _merge_section_pairs(self, section, qa_pairs, existing_qa_pairs, state_qa_pairs):
+        """Tag generated pairs with their section and fold in extracted pairs."""
+        section_title = section['title']
+
+        # Add section to each QA pair
+        for qa in qa_pairs:
+            qa['section'] = section_title
+
+        # Add state-specific QA pairs if any
+        if state_qa_pairs:
+            qa_pairs.extend(state_qa_pairs)
+
+        # Add existing QA pairs if they're not already covered; the set
+        # keeps each membership test O(1) instead of scanning the list
+        existing_questions = {qa['question'].lower() for qa in qa_pairs}
+        for qa in existing_qa_pairs:
+            key = qa['question'].lower()
+            if key not in existing_questions:
+                existing_questions.add(key)
                 qa['section'] = section_title
-                
-            # Add state-specific QA pairs if any
-            if state_qa_pairs:
-                qa_pairs.extend(state_qa_pairs)
-            
-            # Add existing QA pairs if they're not already covered
-            existing_questions = [qa['question'].lower() for qa in qa_pairs]
+                qa_pairs.append(qa)
+
+        return qa_pairs
+
+    def _fallback_pairs(self, section, existing_qa_pairs, state_qa_pairs):
+        """Best-available pairs for a section whose generation failed."""
+        section_title = section['title']
+        if existing_qa_pairs:
             for qa in existing_qa_pairs:
-                if qa['question'].lower() not in existing_questions:
-                    qa['section'] = section_title
-                    qa_pairs.append(qa)
-            
-            return qa_pairs
-            
+                qa['section'] = section_title
+            return existing_qa_pairs
+        elif state_qa_pairs:
+            return state_qa_pairs
+        else:
+            return [{
+                "question": f"What information is available about {section_title}?",
+                "answer": "Please refer to our documentation for detailed information on this topic.",
+                "section": section_title
+            }]
+
+    def _prepare_section(self, section):
+        """Extract the locally derivable pairs for a section."""
+        existing_qa_pairs = self.extract_existing_qa_pairs(section['content'])
+        state_qa_pairs = self.generate_state_specific_qa_pairs(section['content'], section['title'])
+        return existing_qa_pairs, state_qa_pairs
+
+    def _build_section_prompt(self, section, existing_qa_pairs):
+        """Build the dynamic tail of the single-section prompt.
+
+        Everything static lives in STATIC_PREFIX (first, so the prefix
+        is byte-stable across sections); only the per-section title,
+        examples, and content vary here.
+        """
+        section_title = section['title']
+        section_content = section['content']
+
+        # If there are existing QA pairs, use them as examples
+        examples = ""
+        if existing_qa_pairs:
+            examples = "Here are some example QA pairs from the content:\n"
+            for i, qa in enumerate(existing_qa_pairs[:3]):  # Use up to 3 examples
+                examples += f"Example {i+1}:\nQ: {qa['question']}\nA: {qa['answer']}\n\n"
+
+        return (f'\n\nSection Title: "{section_title}"\n\n'
+                f"{examples}Section Content:\n{section_content}\n")
+
+    def _skip_generation(self, section, existing_qa_pairs, state_qa_pairs):
+        """Existing pairs for a section rich enough to skip the LLM, else None.
+
+        An LLM round trip is the most expensive step in this module; a
+        section whose content already carries min_existing_qa extracted
+        pairs has nothing worth paying for.
+        """
+        if self.min_existing_qa and len(existing_qa_pairs) >= self.min_existing_qa:
+            print(f"Section '{section['title']}' already has "
+                  f"{len(existing_qa_pairs)} QA pairs; skipping generation")
+            return self._merge_section_pairs(section, [], existing_qa_pairs, state_qa_pairs)
+        return None
+
+    def generate_qa_pairs_for_section(self, section):
+        """Generate QA pairs for a section using Gemini."""
+        existing_qa_pairs, state_qa_pairs = self._prepare_section(section)
+        skipped = self._skip_generation(section, existing_qa_pairs, state_qa_pairs)
+        if skipped is not None:
+            return skipped
+        model, prompt = self._section_request(section, existing_qa_pairs)
+
+        try:
+            qa_pairs = self._generate_parsed(section['content'], prompt, model=model)
+            return self._merge_section_pairs(section, qa_pairs, existing_qa_pairs, state_qa_pairs)
         except Exception as e:
-            print(f"Error generating QA pairs for section '{section_title}': {e}")
+            print(f"Error generating QA pairs for section '{section['title']}': {e}")
             # Return existing QA pairs if any, or a minimal fallback QA pair
-            if existing_qa_pairs:
-                for qa in existing_qa_pairs:
-                    qa['section'] = section_title
-                return existing_qa_pairs
-            elif state_qa_pairs:
-                return state_qa_pairs
+            return self._fallback_pairs(section, existing_qa_pairs, state_qa_pairs)
+
+    async def _generate_section_async(self, section, semaphore):
+        """Async variant of generate_qa_pairs_for_section.
+
+        Retries with backoff happen inside _generate_parsed_async, so
+        the fallback only fires once transient errors have been retried
+        to exhaustion.
+        """
+        existing_qa_pairs, state_qa_pairs = self._prepare_section(section)
+        skipped = self._skip_generation(section, existing_qa_pairs, state_qa_pairs)
+        if skipped is not None:
+            return section['title'], skipped
+        model, prompt = self._section_request(section, existing_qa_pairs)
+
+        async with semaphore:
+            try:
+                qa_pairs = await self._generate_parsed_async(section['content'], prompt, model=model)
+                return section['title'], self._merge_section_pairs(
+                    section, qa_pairs, existing_qa_pairs, state_qa_pairs)
+            except Exception as e:
+                print(f"Error generating QA pairs for section '{section['title']}': {e}")
+                return section['title'], self._fallback_pairs(
+                    section, existing_qa_pairs, state_qa_pairs)
+
+    def _generate_all_sections(self, sections, concurrency=8):
+        """Run per-section requests concurrently under one event loop.
+
+        Sections are independent, so a Semaphore-bounded gather keeps up
+        to `concurrency` requests in flight instead of idling the
+        network behind a fixed per-section sleep.
+        """
+        from tqdm.asyncio import tqdm_asyncio
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await tqdm_asyncio.gather(
+                *[self._generate_section_async(section, semaphore) for section in sections],
+                desc="Processing sections"
+            )
+
+        return asyncio.run(run())
+
+    def generate_qa_pairs_for_sections(self, batch):
+        """Generate QA pairs for several sections with one Gemini request.
+
+        Keying each section as sec_<i> in the prompt and asking for a
+        JSON object keyed the same way lets one round trip cover
+        BATCH_SIZE sections instead of one.
+
+        Args:
+            batch: List of section dicts
+
+        Returns:
+            List of (section title, QA pairs) tuples parallel to batch,
+            so same-titled sections can't clobber each other
+        """
+        results = [None] * len(batch)
+        prepared = []
+        for pos, section in enumerate(batch):
+            existing, state = self._prepare_section(section)
+            skipped = self._skip_generation(section, existing, state)
+            if skipped is not None:
+                results[pos] = (section['title'], skipped)
             else:
-                return [{
-                    "question": f"What information is available about {section_title}?", 
-                    "answer": "Please refer to our documentation for detailed information on this topic.",
-                    "section": section_title
-                }]
+                prepared.append((pos, section, existing, state))
+
+        if not prepared:
+            return results
+
+        blocks = "\n".join(
+            f"<<<SECTION sec_{i}: {section['title']}>>>\n{section['content']}\n<<<END>>>"
+            for i, (_, section, _, _) in enumerate(prepared)
+        )
+
+        # Static instructions first, section blocks last, so batched
+        # requests share the same byte prefix for Gemini's implicit cache
+        prompt = self.BATCH_PROMPT_TEMPLATE.format(
+            count=len(prepared), guidelines=self.PROMPT_GUIDELINES, blocks=blocks)
+
+        try:
+            by_key = self._generate_parsed(
+                "\n".join(section['content'] for _, section, _, _ in prepared), prompt)
+            # The model occasionally replies with a bare array instead of
+            # the keyed object; treat that like any other bad reply so
+            # every section falls back instead of aborting the file run
+            if not isinstance(by_key, dict):
+                raise ValueError(
+                    f"expected a JSON object keyed by section, got {type(by_key).__name__}")
+
+            for i, (pos, section, existing, state) in enumerate(prepared):
+                qa_pairs = by_key.get(f"sec_{i}") or []
+                if qa_pairs:
+                    results[pos] = (section['title'],
+                                    self._merge_section_pairs(section, qa_pairs, existing, state))
+                else:
+                    results[pos] = (section['title'],
+                                    self._fallback_pairs(section, existing, state))
+        except Exception as e:
+            titles = ", ".join(section['title'] for _, section, _, _ in prepared)
+            print(f"Error generating QA pairs for sections {titles}: {e}")
+            for pos, section, existing, state in prepared:
+                results[pos] = (section['title'],
+                                self._fallback_pairs(section, existing, state))
+        return results
     
-    def process_markdown_file(self, md_file_path, output_filename=None):
-        """Process markdown file and generate QA pairs for each section."""
+    def process_markdown_file(self, md_file_path, output_filename=None, mode="batch",
+                              concurrency=8, output_format="jsonl"):
+        """Process markdown file and generate QA pairs for each section.
+
+        In "batch" mode (the default) sections are folded into
+        BATCH_SIZE-wide Gemini requests, so an N-section document costs
+        ceil(N / BATCH_SIZE) round trips; "sync" sends one request per
+        section but keeps up to `concurrency` of them in flight.
+
+        Pairs are streamed to a .jsonl file as each section finishes,
+        so peak memory is one section's output (and a crash or Ctrl-C
+        keeps everything already generated). The legacy pretty-printed
+        JSON array and per-section files are produced only when
+        output_format="json", buffered from the same pass.
+        """
+        from tqdm import tqdm
+
         # Extract file name for default output
         if output_filename is None:
             file_name = os.path.basename(md_file_path)
             base_name = os.path.splitext(file_name)[0]
             output_filename = f"{base_name}_qa_pairs.json"
-        
+
         # Extract sections
         sections = self.extract_sections(md_file_path)
-        
-        # Generate QA pairs for each section
-        all_qa_pairs = []
-        qa_by_section = {}
-        
-        # Process each section with progress bar
-        for section in tqdm(sections, desc="Processing sections"):
-            print(f"\nProcessing section: {section['title']}")
-            section_qa_pairs = self.generate_qa_pairs_for_section(section)
-            
-            # Add to overall list
-            all_qa_pairs.extend(section_qa_pairs)
-            
-            # Add to section dictionary
-            qa_by_section[section['title']] = section_qa_pairs
-            
-            print(f"Generated {len(section_qa_pairs)} QA pairs for section '{section['title']}'")
-            
-            # Add a small delay to avoid rate limiting
-            time.sleep(1)
-        
-        # Save all QA pairs
+
         output_path = self.output_dir / output_filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(all_qa_pairs, f, indent=2, ensure_ascii=False)
-        
-        print(f"Saved {len(all_qa_pairs)} QA pairs to {output_path}")
-        
-        # Save QA pairs by section
-        section_output_path = self.output_dir / f"sections_{output_filename}"
-        with open(section_output_path, 'w', encoding='utf-8') as f:
-            json.dump(qa_by_section, f, indent=2, ensure_ascii=False)
-        
-        print(f"Saved QA pairs by section to {section_output_path}")
-        
+        jsonl_path = output_path.with_suffix('.jsonl')
+
+        total = 0
+        examples = []
+        # Only the legacy array format needs everything held in memory
+        all_qa_pairs = [] if output_format == "json" else None
+        qa_by_section = {} if output_format == "json" else None
+
+        with open(jsonl_path, 'wb') as out:
+            def emit(title, section_qa_pairs):
+                nonlocal total
+                for qa in section_qa_pairs:
+                    out.write(_jsonl_dumps(qa))
+                out.flush()
+                total += len(section_qa_pairs)
+                if len(examples) < 3:
+                    examples.extend(section_qa_pairs[:3 - len(examples)])
+                if all_qa_pairs is not None:
+                    all_qa_pairs.extend(section_qa_pairs)
+                    qa_by_section[title] = section_qa_pairs
+                print(f"Generated {len(section_qa_pairs)} QA pairs for section '{title}'")
+
+            if mode == "batch":
+                batches = [sections[i:i + self.BATCH_SIZE]
+                           for i in range(0, len(sections), self.BATCH_SIZE)]
+                for batch in tqdm(batches, desc="Processing section batches"):
+                    for title, section_qa_pairs in self.generate_qa_pairs_for_sections(batch):
+                        emit(title, section_qa_pairs)
+            else:
+                # One request per section, run concurrently
+                for title, section_qa_pairs in self._generate_all_sections(sections, concurrency):
+                    emit(title, section_qa_pairs)
+
+        print(f"Saved {total} QA pairs to {jsonl_path}")
+
+        if all_qa_pairs is not None:
+            # Save all QA pairs
+            with open(output_path, 'wb') as f:
+                f.write(_json_dumps_bytes(all_qa_pairs))
+
+            print(f"Saved {len(all_qa_pairs)} QA pairs to {output_path}")
+
+            # Save QA pairs by section
+            section_output_path = self.output_dir / f"sections_{output_filename}"
+            with open(section_output_path, 'wb') as f:
+                f.write(_json_dumps_bytes(qa_by_section))
+
+            print(f"Saved QA pairs by section to {section_output_path}")
+
         # Print a few examples
-        if all_qa_pairs:
+        if examples:
             print("\nExample QA pairs:")
-            for i, qa in enumerate(all_qa_pairs[:3]):
+            for i, qa in enumerate(examples):
                 print(f"\nExample {i+1}:")
                 print(f"Q: {qa['question']}")
                 print(f"A: {qa['answer']}")
-        
+
         return all_qa_pairs, qa_by_section
 
 
+def _process_one(md_file_path, mode, concurrency, use_cache, output_format,
+                 min_existing_qa, tier):
+    """Process one markdown file in a worker process.
+
+    Module-level (so it pickles) and builds its own generator: each
+    worker gets its own Gemini client and event loop, while the
+    response cache is shared safely across workers through SQLite's
+    own file locking.
+    """
+    generator = MDQAPairGenerator(use_cache=use_cache, min_existing_qa=min_existing_qa,
+                                  tier=tier)
+    generator.process_markdown_file(md_file_path, mode=mode, concurrency=concurrency,
+                                    output_format=output_format)
+    return md_file_path
+
+
 def main():
     """Main function to generate QA pairs from markdown files."""
     import argparse
-    
+
     parser = argparse.ArgumentParser(description="Generate QA pairs from markdown files using Gemini API.")
-    parser.add_argument("--input", type=str, required=True, help="Input markdown file path")
+    parser.add_argument("--input", type=str, default=None, help="Input markdown file path")
+    parser.add_argument("--input-glob", type=str, default=None,
+                        help="Directory or glob pattern of markdown files to process "
+                             "in parallel (one worker process per CPU)")
     parser.add_argument("--output", type=str, default=None, help="Output JSON file name")
-    
+    parser.add_argument("--mode", choices=["sync", "batch"], default="batch",
+                        help="Send one request per section (sync) or per batch of sections (batch)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Maximum in-flight Gemini requests in sync mode")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the local response cache and query Gemini fresh")
+    parser.add_argument("--tier", choices=["standard", "flex", "batch"], default="standard",
+                        help="Request tier: flex asks for the discounted sheddable "
+                             "tier, batch routes through the batched-prompt mode")
+    parser.add_argument("--min-existing-qa", type=int, default=5,
+                        help="Skip Gemini for sections already containing this many "
+                             "Q:/A: pairs (0 disables the skip)")
+    parser.add_argument("--format", choices=["jsonl", "json"], default="jsonl",
+                        help="Stream pairs to JSON Lines (jsonl) or additionally "
+                             "buffer the legacy JSON array outputs (json)")
+
     args = parser.parse_args()
-    
-    generator = MDQAPairGenerator()
-    generator.process_markdown_file(args.input, args.output)
+    if not args.input and not args.input_glob:
+        parser.error("one of --input or --input-glob is required")
+
+    # The batch tier is served by the batched-prompt mode; the per-call
+    # tier option only applies to standard/flex
+    tier = args.tier
+    if tier == "batch":
+        args.mode = "batch"
+        tier = "standard"
+
+    if args.input_glob:
+        # Regex/JSON work is CPU-bound and GIL-contended, so files fan
+        # out across worker processes rather than threads; each worker
+        # runs its own asyncio loop for its in-flight Gemini requests
+        import functools
+        import glob as globmod
+        from concurrent.futures import ProcessPoolExecutor
+
+        target = Path(args.input_glob)
+        if target.is_dir():
+            paths = sorted(str(p) for p in target.glob("*.md"))
+        else:
+            paths = sorted(globmod.glob(args.input_glob))
+        if not paths:
+            parser.error(f"no markdown files match {args.input_glob}")
+
+        worker = functools.partial(_process_one, mode=args.mode,
+                                   concurrency=args.concurrency,
+                                   use_cache=not args.no_cache,
+                                   output_format=args.format,
+                                   min_existing_qa=args.min_existing_qa,
+                                   tier=tier)
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for path in executor.map(worker, paths):
+                print(f"Finished {path}")
+        return
+
+    generator = MDQAPairGenerator(use_cache=not args.no_cache,
+                                  min_existing_qa=args.min_existing_qa,
+                                  tier=tier)
+    generator.process_markdown_file(args.input, args.output, mode=args.mode,
+                                    concurrency=args.concurrency,
+                                    output_format=args.format)
 
 
 if __name__ == "__main__":
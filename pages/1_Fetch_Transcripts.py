@@ -1,4 +1,5 @@
 import streamlit as st
+import atexit
 import os
 import json
 import sqlite3
@@ -19,8 +20,21 @@ if dataset_dir not in sys.path:
 from create_db import RetellDatabase, init_database
 from fetch_call_transcript import RetellTranscriptFetcher, SpecificCallFetcher
 
-# Define the correct database path
-DB_PATH = "/mount/src/dataset_generator/DB/UI/retell.sqlite"
+# Cache the fetchers so reruns reuse one long-lived SQLite connection
+# instead of reopening the database on every button click
+@st.cache_resource
+def get_all_fetcher():
+    fetcher = RetellTranscriptFetcher()
+    atexit.register(fetcher.close)
+    return fetcher
+
+
+@st.cache_resource
+def get_specific_fetcher():
+    fetcher = SpecificCallFetcher()
+    atexit.register(fetcher.close)
+    return fetcher
+
 
 # Page configuration
 st.set_page_config(
@@ -71,24 +85,20 @@ with fetch_tab1:
             status_text = st.empty()
             
             try:
-                # Initialize the fetcher with the correct DB path
-                fetcher = RetellTranscriptFetcher(db_path=DB_PATH)
-                
+                # Reuse the cached fetcher (and its warm connection)
+                fetcher = get_all_fetcher()
+
                 # Fetch all calls
                 status_text.text("Fetching calls from Retell API...")
                 result = fetcher.fetch_all_calls(limit=limit)
-                
+
                 if result:
-                    st.success(f"✅ Successfully fetched {len(result)} calls!")
+                    st.success(f"✅ Successfully fetched {result} calls!")
                 else:
                     st.warning("⚠️ No new calls found")
-                    
+
             except Exception as e:
                 st.error(f"❌ Error fetching calls: {str(e)}")
-            finally:
-                # Clean up
-                if 'fetcher' in locals():
-                    fetcher.close()
 
 # Tab 2: Fetch specific calls
 with fetch_tab2:
@@ -106,20 +116,16 @@ with fetch_tab2:
             st.error("❌ Please enter at least one Call ID")
         else:
             try:
-                # Initialize the fetcher with the correct DB path
-                fetcher = SpecificCallFetcher(db_path=DB_PATH)
-                
+                # Reuse the cached fetcher (and its warm connection)
+                fetcher = get_specific_fetcher()
+
                 # Fetch specific calls
                 result = fetcher.fetch_specific_calls(call_ids.split(','))
-                
+
                 if result:
                     st.success(f"✅ Successfully fetched {len(result)} calls!")
                 else:
                     st.warning("⚠️ No calls found with the provided IDs")
-                    
+
             except Exception as e:
-                st.error(f"❌ Error fetching calls: {str(e)}")
-            finally:
-                # Clean up
-                if 'fetcher' in locals():
-                    fetcher.close()
\ No newline at end of file
+                st.error(f"❌ Error fetching calls: {str(e)}")
\ No newline at end of file
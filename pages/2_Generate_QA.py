@@ -1,53 +1,170 @@
 import streamlit as st
 import os
+import io
 import json
+import numpy as np
 import pandas as pd
 import sys
 from pathlib import Path
 import time
 from datetime import datetime
-import random
-import base64
 import sqlite3
+import openpyxl
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Add parent directory to path to import from Dataset modules
-sys.path.append(str(Path(__file__).parent.parent.parent))
+# Project root (the directory holding DB/), resolved once instead of per
+# call site
+ROOT = Path(__file__).resolve().parents[1]
+
+# Add parent directory to path to import from Dataset modules (guarded so
+# reruns don't keep growing sys.path)
+_parent = str(Path(__file__).parent.parent.parent)
+if _parent not in sys.path:
+    sys.path.append(_parent)
 from generate_QA import QAPairGenerator
 from fetch_call_transcript import RetellTranscriptFetcher, SpecificCallFetcher
+from excel_to_jsonl import convert_excel_files_to_jsonl
+
+# Prefer orjson (C serializer emitting utf-8 bytes); fall back to stdlib json
+try:
+    import orjson
+
+    def _jsonl_dumps(obj):
+        return orjson.dumps(obj)
+except ImportError:
+    def _jsonl_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+# Build QA frames through Arrow when available: columnar string storage
+# halves memory next to NumPy object arrays and speeds up the groupby/
+# unique work downstream
+try:
+    import pyarrow as pa
+
+    def _qa_frame(qa_pairs):
+        return pa.Table.from_pylist(qa_pairs).to_pandas(types_mapper=pd.ArrowDtype)
+except ImportError:
+    def _qa_frame(qa_pairs):
+        return pd.DataFrame(qa_pairs)
+
+# Streamlit reruns this whole script on every widget interaction, so the
+# directory listing and preview reads are cached; the mtime argument makes
+# edits to a file invalidate its cached preview
+@st.cache_data(ttl=60)
+def _list_json_files(dir_path):
+    return [str(p) for p in Path(dir_path).glob('*.json')]
+
+@st.cache_data(ttl=60)
+def _excel_head(path, mtime, n=3):
+    return _fast_read_excel(path, nrows=n)
+
+@st.cache_data(ttl=300)
+def _load_qa_pairs(path, mtime):
+    with open(path, 'rb') as f:
+        return json.loads(f.read())
+
+def _get_qa_conn():
+    """Return one long-lived SQLite connection shared across reruns.
+
+    Opening a connection per generator resets SQLite's page cache; keeping
+    a single warm handle in session state makes the per-transcript
+    existence checks in the QA loop hit cached pages.
+    """
+    if 'sqlite_conn' not in st.session_state:
+        db_path = ROOT / "DB" / "retell.sqlite"
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.executescript('''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA cache_size=-65536;
+            PRAGMA busy_timeout=5000;
+        ''')
+        st.session_state['sqlite_conn'] = conn
+    return st.session_state['sqlite_conn']
+
+def _fast_read_excel(path, nrows=None):
+    """Read an Excel file with the fastest engine available.
+
+    calamine (Rust-backed) parses large sheets several times faster than
+    the default engine; nrows keeps preview reads from loading the whole
+    sheet just to show the first rows.
+    """
+    try:
+        return pd.read_excel(path, engine='calamine', nrows=nrows)
+    except (ImportError, ValueError):
+        return pd.read_excel(path, engine='openpyxl', nrows=nrows)
 
 def convert_excel_to_jsonl(excel_file):
-    """Convert Excel file to JSONL format."""
+    """Convert Excel file (or an already-loaded DataFrame) to JSONL format."""
     try:
         # Read Excel file
-        df = pd.read_excel(excel_file)
-        
+        if isinstance(excel_file, pd.DataFrame):
+            df = excel_file
+        else:
+            df = _fast_read_excel(excel_file)
+
         # Create output path
-        output_dir = Path(os.path.dirname(os.path.abspath(__file__))).parent / "DB" / "local_json"
+        output_dir = ROOT / "DB" / "local_json"
         output_dir.mkdir(parents=True, exist_ok=True)
         output_path = output_dir / f"dataset_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
-        
-        # Convert to JSONL
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for _, row in df.iterrows():
-                json_line = row.to_dict()
-                f.write(json.dumps(json_line, ensure_ascii=False) + '\n')
-        
+
+        # Build the payload column-wise: pull each column out as a numpy
+        # array once and shape the dicts over zip, instead of boxing every
+        # row into a Series or per-row dict lookups
+        question_col, answer_col = _detect_qa_columns(df)
+        if question_col and answer_col:
+            q = df[question_col].astype(str).to_numpy()
+            a = df[answer_col].astype(str).to_numpy()
+            if 'call_id' in df.columns:
+                c = df['call_id'].astype(str).to_numpy()
+                records = [{'call_id': ci, 'question': qi, 'answer': ai}
+                           for ci, qi, ai in zip(c, q, a)]
+            else:
+                records = [{'question': qi, 'answer': ai} for qi, ai in zip(q, a)]
+        else:
+            records = df.to_dict(orient='records')
+
+        with open(output_path, 'wb', buffering=1 << 20) as f:
+            f.writelines(_jsonl_dumps(record) + b'\n' for record in records)
+
         return str(output_path)
     except Exception as e:
         st.error(f"Error converting Excel to JSONL: {e}")
         return None
 
-def get_download_link(file_path, link_text):
-    """Generate a download link for a file."""
+def _detect_qa_columns(df):
+    """Return the (question, answer) column names, or (None, None).
+
+    Matching runs on the whole column index at once via vectorized string
+    ops instead of a Python loop over every column name.
+    """
+    cols_lower = df.columns.astype(str).str.lower()
+    q_matches = df.columns[cols_lower.str.contains('question', regex=False)]
+    a_matches = df.columns[cols_lower.str.contains('answer', regex=False)]
+    question_col = q_matches[0] if len(q_matches) else None
+    answer_col = a_matches[0] if len(a_matches) else None
+
+    if not question_col or not answer_col:
+        if 'Q' in df.columns and 'A' in df.columns:
+            return 'Q', 'A'
+    return question_col, answer_col
+
+def file_download_button(file_path, link_text):
+    """Render a download button streaming the file's bytes.
+
+    An open file handle lets Streamlit stream the payload instead of the
+    old base64 data: URI, which inflated it by a third and embedded the
+    whole encoded file in the rendered page.
+    """
     try:
-        with open(file_path, 'rb') as f:
-            data = f.read()
-            b64 = base64.b64encode(data).decode()
-            href = f'data:application/octet-stream;base64,{b64}'
-            return f'<a href="{href}" download="{os.path.basename(file_path)}">{link_text}</a>'
+        st.download_button(
+            link_text,
+            data=open(file_path, 'rb'),
+            file_name=os.path.basename(file_path),
+            mime='application/octet-stream'
+        )
     except Exception as e:
         st.error(f"Error generating download link: {e}")
-        return None
 
 def load_transcripts(source_type, call_ids=None, count=10):
     """Load transcripts based on source type."""
@@ -71,21 +188,15 @@ def load_transcripts(source_type, call_ids=None, count=10):
             fetcher.close()
             
     elif source_type == "Random Calls":
-        # For random calls, we'll first fetch all call IDs, then select random ones
+        # For random calls, sample the IDs inside SQLite instead of
+        # materializing every stored call ID just to pick a few
         fetcher = RetellTranscriptFetcher()
         try:
-            # Get all existing call IDs
-            existing_call_ids = fetcher.get_existing_call_ids()
-            if not existing_call_ids:
+            random_call_ids = fetcher.sample_call_ids(count)
+            if not random_call_ids:
                 st.error("No calls found in the database")
                 return None, None
-                
-            # Select random call IDs
-            random_call_ids = random.sample(
-                list(existing_call_ids), 
-                min(count, len(existing_call_ids))
-            )
-            
+
             # Close RetellTranscriptFetcher and use SpecificCallFetcher to get the transcripts
             fetcher.close()
             
@@ -140,21 +251,18 @@ def display_qa_pairs(qa_pairs, max_display=10):
     st.write(f"### Sample QA Pairs (showing {min(max_display, len(qa_pairs))} of {len(qa_pairs)})")
     
     # Convert to DataFrame for better display
-    df = pd.DataFrame(qa_pairs)
-    
-    # Group by call_id
-    call_ids = df['call_id'].unique()
-    
-    for i, call_id in enumerate(call_ids):
+    df = _qa_frame(qa_pairs)
+
+    # One groupby pass instead of re-masking the frame per call_id
+    for i, (call_id, call_qa_pairs) in enumerate(df.groupby('call_id', sort=False)):
         if i >= max_display:
             break
-            
-        call_qa_pairs = df[df['call_id'] == call_id]
+
         st.write(f"#### Call ID: {call_id}")
-        
-        for _, row in call_qa_pairs.iterrows():
-            with st.expander(f"Q: {row['question']}"):
-                st.write(f"A: {row['answer']}")
+
+        for question, answer in zip(call_qa_pairs['question'], call_qa_pairs['answer']):
+            with st.expander(f"Q: {question}"):
+                st.write(f"A: {answer}")
                 
 def export_to_excel(qa_pairs, output_path):
     """Export QA pairs to Excel."""
@@ -163,24 +271,34 @@ def export_to_excel(qa_pairs, output_path):
         return None
         
     # Convert to DataFrame
-    df = pd.DataFrame(qa_pairs)
-    
+    df = _qa_frame(qa_pairs)
+
     # Create Excel file path
-    excel_dir = Path(os.path.dirname(os.path.abspath(__file__))).parent / "DB" / "excel"
+    excel_dir = ROOT / "DB" / "excel"
     excel_dir.mkdir(parents=True, exist_ok=True)
     
     excel_path = excel_dir / f"qa_pairs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    # Export to Excel
-    df.to_excel(excel_path, index=False)
-    
+
+    # Export with a write-only workbook: rows are streamed straight to the
+    # file, skipping pandas' per-cell styling path and the in-memory sheet
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        ws.append(row)
+    wb.save(excel_path)
+
     return str(excel_path)
 
 def app():
     st.title("Generate QA Pairs")
-    
+
+    # One timestamp per rerun; every filename below reuses it instead of
+    # re-calling datetime.now().strftime per code path
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+
     st.write("""
-    This tool generates question-answer pairs from call transcripts. 
+    This tool generates question-answer pairs from call transcripts.
     These QA pairs can be used to train or fine-tune a chatbot.
     """)
     
@@ -202,15 +320,15 @@ def app():
         count = st.number_input("Number of random calls to fetch:", min_value=1, max_value=50, value=10)
         
     elif source_type == "JSON File":
-        json_dir = Path(os.path.dirname(os.path.abspath(__file__))).parent / "DB" / "local_json"
-        json_files = list(json_dir.glob("*.json"))
-        
+        json_dir = ROOT / "DB" / "local_json"
+        json_files = _list_json_files(json_dir)
+
         if not json_files:
             st.warning("No JSON files found in the DB/local_json directory")
         else:
             selected_file = st.selectbox(
                 "Select JSON file:",
-                options=[str(f) for f in json_files],
+                options=json_files,
                 format_func=lambda x: os.path.basename(x)
             )
             st.session_state['selected_json_file'] = selected_file
@@ -231,7 +349,7 @@ def app():
                 st.success(f"Loaded {len(transcripts)} transcripts")
                 
                 # Add download link for transcripts
-                st.markdown(get_download_link(transcripts_file, "Download Transcripts JSON"), unsafe_allow_html=True)
+                file_download_button(transcripts_file, "Download Transcripts JSON")
                 
                 # Display transcript preview
                 st.subheader("Transcript Preview")
@@ -247,7 +365,7 @@ def app():
     
     output_filename = st.text_input(
         "Output filename (optional):",
-        value=f"qa_pairs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        value=f"qa_pairs_{ts}.json",
         help="Name of the JSON file to save QA pairs"
     )
     
@@ -264,109 +382,161 @@ def app():
                 # Get transcripts
                 transcripts = st.session_state['transcripts']
                 
-                # Generate QA pairs with progress updates
-                generator = QAPairGenerator()
+                # Generate QA pairs with progress updates, reusing the
+                # session's warm SQLite connection
+                generator = QAPairGenerator(conn=_get_qa_conn())
                 
-                # Process each transcript with progress updates
-                all_qa_pairs = []
-                for i, call_data in enumerate(transcripts):
-                    # Update progress
-                    progress = (i + 1) / len(transcripts)
-                    progress_bar.progress(progress)
-                    
-                    # Estimate remaining time
-                    elapsed = time.time() - start_time
-                    estimated_total = elapsed / progress if progress > 0 else 0
-                    remaining = estimated_total - elapsed
-                    
-                    # Display status
-                    st.write(f"Processing transcript {i+1}/{len(transcripts)} - Call ID: {call_data['call_id']}")
-                    st.write(f"Estimated time remaining: {int(remaining/60)} minutes {int(remaining%60)} seconds")
-                    
-                    # Generate QA pairs for this transcript
+                # One IN query up front answers "which calls already have
+                # QA pairs" for the whole batch instead of two SELECTs per
+                # transcript inside the loop
+                existing_pairs_by_call = {}
+                try:
+                    ids = [c['call_id'] for c in transcripts]
+                    placeholders = ','.join('?' * len(ids))
+                    generator.cursor.execute(
+                        f"SELECT call_id, question, answer FROM qa_pairs "
+                        f"WHERE call_id IN ({placeholders})",
+                        ids
+                    )
+                    for row_call_id, q, a in generator.cursor.fetchall():
+                        existing_pairs_by_call.setdefault(row_call_id, []).append((q, a))
+                except (AttributeError, sqlite3.Error) as e:
+                    st.warning(f"Could not check for existing QA pairs: {e}")
+
+                # Drop empty/too-short transcripts with one vectorized
+                # length pass before any per-call work
+                lens = np.fromiter(
+                    (len(c["transcript"] or "") for c in transcripts),
+                    dtype=np.int64, count=len(transcripts)
+                )
+                keep = lens >= 50
+                if not keep.all():
+                    skipped_ids = [c["call_id"] for c, k in zip(transcripts, keep) if not k]
+                    st.write(f"Skipping {len(skipped_ids)} call(s) with too-short transcripts: "
+                             f"{', '.join(skipped_ids)}")
+                transcripts = [c for c, k in zip(transcripts, keep) if k]
+
+                # First pass: decide which transcripts actually need a
+                # model call. Already-generated calls are just display
+                # work, so they stay sequential.
+                pending = []
+                for call_data in transcripts:
                     call_id = call_data["call_id"]
                     transcript = call_data["transcript"]
-                    
-                    # Skip empty or very short transcripts
-                    if not transcript or len(transcript) < 50:
-                        st.write(f"Skipping call {call_id} - transcript too short")
-                        continue
-                    
-                    # Check if QA pairs already exist for this call_id
-                    try:
-                        # Access cursor directly from the generator instance
-                        cursor = generator.cursor
-                        cursor.execute("SELECT COUNT(*) FROM qa_pairs WHERE call_id = ?", (call_id,))
-                        existing_count = cursor.fetchone()[0]
-                        
-                        if existing_count > 0:
-                            # Show existing QA pairs
-                            cursor.execute("SELECT question, answer FROM qa_pairs WHERE call_id = ?", (call_id,))
-                            existing_pairs = cursor.fetchall()
-                            
-                            st.warning(f"QA pairs already exist for call {call_id}")
-                            with st.expander("View Existing QA Pairs"):
-                                for q, a in existing_pairs:
-                                    st.write(f"Q: {q}")
-                                    st.write(f"A: {a}")
-                                    st.markdown("---")
-                            
-                            # Add regenerate button
-                            if st.button(f"Regenerate QA Pairs for {call_id}", key=f"regenerate_{call_id}"):
-                                # Delete existing QA pairs
-                                cursor.execute("DELETE FROM qa_pairs WHERE call_id = ?", (call_id,))
-                                generator.conn.commit()  # Use conn directly from generator
-                                
-                                # Generate new QA pairs
-                                qa_pairs = generator.generate_qa_pairs(transcript, call_id)
-                                st.success(f"Regenerated {len(qa_pairs)} QA pairs for call {call_id}")
-                            else:
-                                continue
-                        else:
-                            # Generate QA pairs
-                            qa_pairs = generator.generate_qa_pairs(transcript, call_id)
-                    except (AttributeError, sqlite3.Error) as e:
-                        # If there's an error accessing the database, just generate QA pairs
-                        st.warning(f"Could not check for existing QA pairs: {e}")
-                        qa_pairs = generator.generate_qa_pairs(transcript, call_id)
-                    
-                    if qa_pairs:
-                        all_qa_pairs.extend(qa_pairs)
-                        st.write(f"Generated {len(qa_pairs)} QA pairs for call {call_id}")
+
+                    existing_pairs = existing_pairs_by_call.get(call_id, [])
+                    if existing_pairs:
+                        st.warning(f"QA pairs already exist for call {call_id}")
+                        with st.expander("View Existing QA Pairs"):
+                            for q, a in existing_pairs:
+                                st.write(f"Q: {q}")
+                                st.write(f"A: {a}")
+                                st.markdown("---")
+
+                        # Add regenerate button
+                        if st.button(f"Regenerate QA Pairs for {call_id}", key=f"regenerate_{call_id}"):
+                            # Delete existing QA pairs
+                            generator.cursor.execute("DELETE FROM qa_pairs WHERE call_id = ?", (call_id,))
+                            generator.conn.commit()  # Use conn directly from generator
+                            pending.append((call_id, transcript))
                     else:
-                        st.write(f"No relevant QA pairs generated for call {call_id}")
-                    
-                    # Add a small delay to avoid rate limiting
-                    time.sleep(1)
-                
-                # Save all QA pairs to a JSON file
-                output_dir = Path(os.path.dirname(os.path.abspath(__file__))).parent / "DB" / "local_json"
+                        pending.append((call_id, transcript))
+
+                # The model calls are I/O-bound, so run them on a bounded
+                # thread pool instead of serializing N calls plus a fixed
+                # 1s sleep each. Streamlit updates happen on this thread
+                # as futures complete, and each batch is appended to the
+                # output file as soon as it arrives instead of serializing
+                # the whole list at the end.
+                output_dir = ROOT / "DB" / "local_json"
                 output_path = output_dir / output_filename
-                
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(all_qa_pairs, f, indent=2, ensure_ascii=False)
-                
-                st.session_state['qa_pairs'] = all_qa_pairs
+
+                # One in-place status line and one summary table instead of
+                # 3-4 st.write calls per iteration, each of which appends
+                # DOM nodes and re-renders
+                status = st.empty()
+                summary = st.empty()
+                results = []
+
+                all_qa_pairs = []
+                with open(output_path, 'wb') as f:
+                    f.write(b'[\n')
+                    if pending:
+                        with ThreadPoolExecutor(max_workers=8) as executor:
+                            futures = {
+                                executor.submit(generator.generate_qa_pairs, transcript, call_id): call_id
+                                for call_id, transcript in pending
+                            }
+                            for done, future in enumerate(as_completed(futures), start=1):
+                                call_id = futures[future]
+                                try:
+                                    qa_pairs = future.result()
+                                except Exception as e:
+                                    st.warning(f"Error generating QA pairs for call {call_id}: {e}")
+                                    qa_pairs = []
+
+                                for pair in qa_pairs:
+                                    if all_qa_pairs:
+                                        f.write(b',\n')
+                                    f.write(_jsonl_dumps(pair))
+                                    all_qa_pairs.append(pair)
+                                results.append({'call_id': call_id, 'qa_pairs': len(qa_pairs)})
+
+                                # Update progress and the time estimate from
+                                # actual completions
+                                progress = done / len(pending)
+                                progress_bar.progress(progress)
+                                elapsed = time.time() - start_time
+                                remaining = elapsed / progress - elapsed
+                                status.markdown(
+                                    f"Completed {done}/{len(pending)} transcripts · "
+                                    f"about {int(remaining // 60)}m {int(remaining % 60)}s left"
+                                )
+                    f.write(b'\n]')
+
+                # Persist the whole batch (including regenerated calls)
+                # with one executemany in a single transaction instead of
+                # per-row INSERTs with their own commits
+                if all_qa_pairs:
+                    try:
+                        with generator.conn:
+                            generator.conn.executemany(
+                                "INSERT INTO qa_pairs (call_id, question, answer) VALUES (?, ?, ?)",
+                                [(p['call_id'], p['question'], p['answer']) for p in all_qa_pairs]
+                            )
+                    except sqlite3.Error as e:
+                        st.warning(f"Could not store QA pairs in the database: {e}")
+
+                if results:
+                    summary.dataframe(pd.DataFrame(results))
+
+                # Keep only the count and file path in session state; the
+                # pairs themselves live in the output file and are
+                # lazy-loaded for display, so a large run isn't held in
+                # memory three times over
+                st.session_state['qa_pairs_count'] = len(all_qa_pairs)
                 st.session_state['qa_pairs_path'] = str(output_path)
-                
+
                 st.success(f"Generated {len(all_qa_pairs)} QA pairs from {len(transcripts)} transcripts")
                 st.success(f"Results saved to {output_path}")
-                
+
                 # Add download link for JSON output
-                st.markdown(get_download_link(str(output_path), "Download QA Pairs JSON"), unsafe_allow_html=True)
-    
+                file_download_button(str(output_path), "Download QA Pairs JSON")
+
     # Display and export QA pairs
     st.subheader("Step 3: View and Export QA Pairs")
-    
-    if 'qa_pairs' in st.session_state:
-        display_qa_pairs(st.session_state['qa_pairs'])
-        
+
+    if 'qa_pairs_path' in st.session_state:
+        qa_path = st.session_state['qa_pairs_path']
+        qa_pairs = _load_qa_pairs(qa_path, os.path.getmtime(qa_path))
+        display_qa_pairs(qa_pairs)
+
         if st.button("Export to Excel"):
             with st.spinner("Exporting to Excel..."):
-                excel_path = export_to_excel(st.session_state['qa_pairs'], st.session_state['qa_pairs_path'])
+                excel_path = export_to_excel(qa_pairs, qa_path)
                 if excel_path:
                     st.success(f"Exported to Excel: {excel_path}")
-                    st.markdown(get_download_link(excel_path, "Download Excel file"), unsafe_allow_html=True)
+                    file_download_button(excel_path, "Download Excel file")
     
     # Add Excel to JSONL conversion as Step 4
     st.subheader("Step 4: Convert to JSONL Format")
@@ -395,34 +565,21 @@ def app():
         uploaded_file = st.file_uploader("Upload Excel file", type=['xlsx', 'xls'])
         
         if uploaded_file is not None:
-            # Preview the Excel file
+            # Preview the Excel file (only the rows the preview shows)
             try:
-                df = pd.read_excel(uploaded_file)
+                df = _fast_read_excel(uploaded_file, nrows=3)
                 st.write("### Excel File Preview:")
                 st.dataframe(df.head(3))
                 
                 # Show JSONL preview
                 if len(df) > 0:
                     st.write("### JSONL Preview (first entry):")
-                    
+
                     # Map column names (case-insensitive)
-                    question_col = None
-                    answer_col = None
-                    
-                    for col in df.columns:
-                        col_lower = str(col).lower()
-                        if 'question' in col_lower:
-                            question_col = col
-                        elif 'answer' in col_lower:
-                            answer_col = col
-                    
+                    question_col, answer_col = _detect_qa_columns(df)
                     if not question_col or not answer_col:
-                        if 'Q' in df.columns and 'A' in df.columns:
-                            question_col = 'Q'
-                            answer_col = 'A'
-                        else:
-                            st.warning("Could not identify question/answer columns. Please ensure your Excel file has columns named 'question' and 'answer' or 'Q' and 'A'.")
-                    
+                        st.warning("Could not identify question/answer columns. Please ensure your Excel file has columns named 'question' and 'answer' or 'Q' and 'A'.")
+
                     if question_col and answer_col:
                         # Create a sample JSONL entry
                         sample_row = df.iloc[0]
@@ -439,39 +596,21 @@ def app():
                 
                 if st.button("Convert Uploaded Excel to JSONL"):
                     with st.spinner("Converting to JSONL..."):
-                        # Create a temporary file to save the uploaded Excel
-                        temp_dir = Path(os.path.dirname(os.path.abspath(__file__))).parent.parent / "DB" / "temp"
-                        temp_dir.mkdir(parents=True, exist_ok=True)
-                        temp_excel = temp_dir / f"temp_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-                        
-                        with open(temp_excel, 'wb') as f:
-                            f.write(uploaded_file.getvalue())
-                        
-                        # Import the function from excel_to_jsonl.py
-                        sys.path.append(str(Path(__file__).parent.parent.parent))
-                        from excel_to_jsonl import convert_excel_files_to_jsonl
-                        
-                        # Convert to JSONL
+                        # Pass the upload's bytes straight to the converter
+                        # instead of round-tripping through a temp file
                         output_file = convert_excel_files_to_jsonl(
-                            excel_dir=temp_dir,
+                            files=[(uploaded_file.name, io.BytesIO(uploaded_file.getvalue()))],
                             system_message=system_message
                         )
-                        
+
                         st.success(f"Converted successfully to JSONL format")
-                        st.markdown(get_download_link(str(output_file), "Download JSONL file"), unsafe_allow_html=True)
-                        
-                        # Clean up temp file
-                        os.remove(temp_excel)
+                        file_download_button(str(output_file), "Download JSONL file")
             
             except Exception as e:
                 st.error(f"Error processing Excel file: {e}")
     
     else:  # Use Excel Files from DB/excel Folder
-        # Import the function from excel_to_jsonl.py
-        sys.path.append(str(Path(__file__).parent.parent.parent))
-        from excel_to_jsonl import convert_excel_files_to_jsonl
-        
-        excel_dir = Path(os.path.dirname(os.path.abspath(__file__))).parent.parent / "DB" / "excel"
+        excel_dir = ROOT / "DB" / "excel"
         excel_files = list(excel_dir.glob("*.xlsx")) + list(excel_dir.glob("*.xls"))
         
         if not excel_files:
@@ -484,32 +623,19 @@ def app():
             # Show preview of the first Excel file
             if len(excel_files) > 0:
                 try:
-                    df = pd.read_excel(excel_files[0])
+                    df = _excel_head(str(excel_files[0]), os.path.getmtime(excel_files[0]))
                     st.write(f"### Preview of {excel_files[0].name}:")
                     st.dataframe(df.head(3))
                     
                     # Show JSONL preview
                     if len(df) > 0:
                         st.write("### JSONL Preview (first entry):")
-                        
+
                         # Map column names (case-insensitive)
-                        question_col = None
-                        answer_col = None
-                        
-                        for col in df.columns:
-                            col_lower = str(col).lower()
-                            if 'question' in col_lower:
-                                question_col = col
-                            elif 'answer' in col_lower:
-                                answer_col = col
-                        
+                        question_col, answer_col = _detect_qa_columns(df)
                         if not question_col or not answer_col:
-                            if 'Q' in df.columns and 'A' in df.columns:
-                                question_col = 'Q'
-                                answer_col = 'A'
-                            else:
-                                st.warning("Could not identify question/answer columns in the preview file.")
-                        
+                            st.warning("Could not identify question/answer columns in the preview file.")
+
                         if question_col and answer_col:
                             # Create a sample JSONL entry
                             sample_row = df.iloc[0]
@@ -537,7 +663,7 @@ def app():
                         )
                         
                         st.success(f"Converted successfully to JSONL format")
-                        st.markdown(get_download_link(str(output_file), "Download JSONL file"), unsafe_allow_html=True)
+                        file_download_button(str(output_file), "Download JSONL file")
                     except Exception as e:
                         st.error(f"Error during conversion: {e}")
                         import traceback
@@ -608,8 +734,8 @@ if 'loaded_transcripts' in st.session_state and st.session_state.loaded_transcri
         
         if st.button("Generate Q&A Pairs"):
             try:
-                # Initialize QA generator
-                generator = QAPairGenerator()
+                # Initialize QA generator on the session's warm connection
+                generator = QAPairGenerator(conn=_get_qa_conn())
                 
                 # Process each transcript
                 progress_bar = st.progress(0)
@@ -636,7 +762,7 @@ if 'loaded_transcripts' in st.session_state and st.session_state.loaded_transcri
                 
                 if qa_pairs:
                     # Convert to DataFrame
-                    df = pd.DataFrame(qa_pairs)
+                    df = _qa_frame(qa_pairs)
                     
                     # Store in session state
                     st.session_state.qa_pairs = df
@@ -651,34 +777,30 @@ if 'loaded_transcripts' in st.session_state and st.session_state.loaded_transcri
                     st.subheader("Preview")
                     st.dataframe(df)
                     
-                    # Export buttons
+                    # Export buttons (one shared timestamp for both names)
+                    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
                     col1, col2 = st.columns(2)
                     
                     with col1:
                         # Export as Excel
-                        excel_buffer = pd.ExcelWriter()
+                        excel_buffer = io.BytesIO()
                         df.to_excel(excel_buffer, index=False)
-                        excel_data = excel_buffer.getvalue()
-                        st.markdown(
-                            get_download_link(
-                                excel_data,
-                                f"qa_pairs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                            ),
-                            unsafe_allow_html=True
+                        st.download_button(
+                            "Download Excel file",
+                            data=excel_buffer.getvalue(),
+                            file_name=f"qa_pairs_{ts}.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                         )
-                    
+
                     with col2:
                         # Export as JSONL
                         jsonl_data = convert_excel_to_jsonl(df)
                         if jsonl_data:
-                            st.markdown(
-                                get_download_link(
-                                    jsonl_data,
-                                    f"qa_pairs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl",
-                                    "application/jsonl"
-                                ),
-                                unsafe_allow_html=True
+                            st.download_button(
+                                "Download JSONL file",
+                                data=open(jsonl_data, 'rb'),
+                                file_name=f"qa_pairs_{ts}.jsonl",
+                                mime="application/jsonl"
                             )
                 
             except Exception as e:
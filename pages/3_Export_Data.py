@@ -1,20 +1,32 @@
 import streamlit as st
 import os
+import hashlib
 import json
 import sqlite3
 import pandas as pd
+import xlsxwriter
 from pathlib import Path
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Prefer orjson (Rust serializer, emits utf-8 bytes directly); fall back to
+# the stdlib encoder if it is not installed
+try:
+    import orjson
+
+    def json_dumps_bytes(obj):
+        return orjson.dumps(obj)
+except ImportError:
+    def json_dumps_bytes(obj):
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
 # Add the parent directory to sys.path to import from sibling directories
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
-# Import the necessary modules
-from excel_to_jsonl import convert_excel_files_to_jsonl
-
 # Page configuration
 st.set_page_config(
     page_title="Export Data",
@@ -45,26 +57,105 @@ if not db_path.exists():
     st.info("Please go to the 'Fetch Transcripts' page to set up the database first.")
     st.stop()
 
-# Connect to the database
+
+def open_readonly_connection():
+    """Open a read-only connection tuned for export scans.
+
+    mode=ro keeps exports from blocking writers on the other pages, and the
+    mmap/cache pragmas let SQLite serve row data from the page cache instead
+    of per-read syscalls. Temp tables (used for call-id filtering) still work
+    because they live in the separate temp database.
+    """
+    ro_conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    ro_conn.execute("PRAGMA mmap_size=268435456")
+    ro_conn.execute("PRAGMA cache_size=-65536")
+    return ro_conn
+
+
+def execute_qa_query(query_cursor, filter_ids):
+    """Select qa_pairs rows, filtering via a temp-table join when IDs are given.
+
+    A temp table avoids the one-placeholder-per-ID IN list, which hits
+    SQLITE_MAX_VARIABLE_NUMBER on long pasted lists and forces a replan
+    every time the list changes.
+    """
+    if filter_ids:
+        query_cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _filter(call_id TEXT PRIMARY KEY)")
+        query_cursor.execute("DELETE FROM _filter")
+        query_cursor.executemany("INSERT OR IGNORE INTO _filter VALUES (?)",
+                                 [(call_id,) for call_id in filter_ids])
+        query_cursor.execute("""
+            SELECT q.call_id, q.question, q.answer
+            FROM qa_pairs q JOIN _filter f ON q.call_id = f.call_id
+        """)
+    else:
+        query_cursor.execute("SELECT call_id, question, answer FROM qa_pairs")
+    return query_cursor
+
+
+def run_export_with_progress(export_fn, total_rows):
+    """Run an export function on a worker thread and show its progress.
+
+    export_fn receives a mutable {'rows': n} dict it should update as it
+    writes; the main thread polls that counter to drive st.progress instead
+    of freezing the UI for the whole export.
+    """
+    executor = st.session_state.setdefault("export_executor", ThreadPoolExecutor(max_workers=1))
+    progress = {"rows": 0}
+    future = executor.submit(export_fn, progress)
+
+    progress_bar = st.progress(0.0)
+    while not future.done():
+        if total_rows:
+            progress_bar.progress(min(progress["rows"] / total_rows, 1.0))
+        time.sleep(0.1)
+    progress_bar.progress(1.0)
+    return future.result()
+
+
+@st.cache_data(ttl=300)
+def load_export_stats(db_mtime):
+    """Load QA pair and call counts in a single scan, keyed by the db file mtime."""
+    stats_conn = open_readonly_connection()
+    try:
+        stats_cursor = stats_conn.cursor()
+        stats_cursor.execute("SELECT COUNT(*), COUNT(DISTINCT call_id) FROM qa_pairs")
+        qa_count, num_calls = stats_cursor.fetchone()
+    finally:
+        stats_conn.close()
+    return qa_count, num_calls
+
+
+@st.cache_data(ttl=300)
+def list_call_ids(db_mtime):
+    """Return the distinct call IDs in the database, keyed by the db file mtime."""
+    ids_conn = open_readonly_connection()
+    try:
+        ids_cursor = ids_conn.cursor()
+        ids_cursor.execute("SELECT DISTINCT call_id FROM qa_pairs")
+        call_id_list = [row[0] for row in ids_cursor]
+    finally:
+        ids_conn.close()
+    return call_id_list
+
+
+# Cache key: the database file's mtime, so caches invalidate when the db changes
+db_mtime = os.path.getmtime(db_path)
+
+# Connect to the database (read-only: exports never write to it)
 try:
-    conn = sqlite3.connect(db_path)
+    conn = open_readonly_connection()
     cursor = conn.cursor()
-    
-    # Get QA pair count
-    cursor.execute("SELECT COUNT(*) FROM qa_pairs")
-    qa_count = cursor.fetchone()[0]
-    
+
+    # Get QA pair and call counts in one pass
+    qa_count, num_calls = load_export_stats(db_mtime)
+
     if qa_count == 0:
         st.warning("No QA pairs found in the database. Please generate QA pairs first.")
         st.info("Go to the 'Generate QA' page to create question-answer pairs.")
         conn.close()
         st.stop()
-    
-    # Get unique call IDs
-    cursor.execute("SELECT DISTINCT call_id FROM qa_pairs")
-    unique_calls = cursor.fetchall()
-    num_calls = len(unique_calls)
-    
+
     st.success(f"Found {qa_count} QA pairs from {num_calls} calls in the database")
     
     # Create tabs for different export formats
@@ -82,10 +173,9 @@ try:
         
         call_ids = []
         if filter_by_call:
-            # Get all call IDs
-            cursor.execute("SELECT DISTINCT call_id FROM qa_pairs")
-            all_call_ids = [row[0] for row in cursor.fetchall()]
-            
+            # Get all call IDs from the cached list
+            all_call_ids = list_call_ids(db_mtime)
+
             # Display a sample of call IDs
             with st.expander("View available call IDs"):
                 st.write(all_call_ids[:10] if len(all_call_ids) > 10 else all_call_ids)
@@ -108,44 +198,53 @@ try:
         # Export button
         if st.button("Export to Excel"):
             try:
-                # Create a query based on filters
-                if filter_by_call and call_ids:
-                    placeholders = ", ".join(["?" for _ in call_ids])
-                    query = f"SELECT call_id, question, answer FROM qa_pairs WHERE call_id IN ({placeholders})"
-                    cursor.execute(query, call_ids)
-                else:
-                    cursor.execute("SELECT call_id, question, answer FROM qa_pairs")
-                
-                # Fetch all rows
-                rows = cursor.fetchall()
-                
-                if not rows:
+                output_path = excel_dir / output_filename
+
+                def export_excel(progress):
+                    # Stream rows straight from the cursor into a constant-memory
+                    # xlsxwriter workbook instead of materializing them all first
+                    execute_qa_query(cursor, call_ids if filter_by_call else None)
+                    cursor.arraysize = 1000
+
+                    workbook = xlsxwriter.Workbook(str(output_path), {"constant_memory": True})
+                    worksheet = workbook.add_worksheet()
+                    worksheet.write_row(0, 0, ["Call ID", "Question", "Answer"])
+
+                    preview = []
+                    rows_written = 0
+                    for chunk in iter(lambda: cursor.fetchmany(cursor.arraysize), []):
+                        for row in chunk:
+                            rows_written += 1
+                            worksheet.write_row(rows_written, 0, row)
+                            if len(preview) < 10:
+                                preview.append(row)
+                        progress["rows"] = rows_written
+                    workbook.close()
+                    return rows_written, preview
+
+                row_count, preview_rows = run_export_with_progress(export_excel, qa_count)
+
+                if row_count == 0:
+                    os.remove(output_path)
                     st.warning("No QA pairs found with the selected filters.")
                 else:
-                    # Create DataFrame
-                    df = pd.DataFrame(rows, columns=["Call ID", "Question", "Answer"])
-                    
-                    # Save to Excel
-                    output_path = excel_dir / output_filename
-                    df.to_excel(output_path, index=False)
-                    
                     # Show success message
-                    st.success(f"✅ Successfully exported {len(df)} QA pairs to {output_path}")
-                    
-                    # Provide download button
-                    with open(output_path, "rb") as f:
-                        excel_data = f.read()
+                    st.success(f"✅ Successfully exported {row_count} QA pairs to {output_path}")
                     
+                    # Provide download button; hand the open file to Streamlit
+                    # instead of reading a full copy into memory first
                     st.download_button(
                         label="Download Excel File",
-                        data=excel_data,
+                        data=open(output_path, "rb"),
                         file_name=output_filename,
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
                     
-                    # Display preview
+                    # Display preview. The full export never touches pandas;
+                    # only the 10 buffered preview rows are framed here.
                     with st.expander("Preview Data"):
-                        st.dataframe(df.head(10) if len(df) > 10 else df)
+                        preview_df = pd.DataFrame(preview_rows, columns=["Call ID", "Question", "Answer"])
+                        st.dataframe(preview_df)
             
             except Exception as e:
                 st.error(f"❌ Error exporting to Excel: {str(e)}")
@@ -162,10 +261,9 @@ try:
         
         call_ids_json = []
         if filter_by_call_json:
-            # Get all call IDs
-            cursor.execute("SELECT DISTINCT call_id FROM qa_pairs")
-            all_call_ids = [row[0] for row in cursor.fetchall()]
-            
+            # Get all call IDs from the cached list
+            all_call_ids = list_call_ids(db_mtime)
+
             # Display a sample of call IDs
             with st.expander("View available call IDs"):
                 st.write(all_call_ids[:10] if len(all_call_ids) > 10 else all_call_ids)
@@ -196,54 +294,61 @@ try:
         # Export button
         if st.button("Export to JSON"):
             try:
-                # Create a query based on filters
-                if filter_by_call_json and call_ids_json:
-                    placeholders = ", ".join(["?" for _ in call_ids_json])
-                    query = f"SELECT call_id, question, answer FROM qa_pairs WHERE call_id IN ({placeholders})"
-                    cursor.execute(query, call_ids_json)
-                else:
-                    cursor.execute("SELECT call_id, question, answer FROM qa_pairs")
-                
-                # Fetch all rows
-                rows = cursor.fetchall()
-                
-                if not rows:
+                sys_msg = {"role": "system", "content": system_message}
+                output_path = json_dir / output_filename_json
+
+                def export_json(progress):
+                    # Stream records to disk one at a time instead of building
+                    # the full list in memory before serializing
+                    execute_qa_query(cursor, call_ids_json if filter_by_call_json else None)
+                    cursor.arraysize = 2000
+
+                    preview = []
+                    records_written = 0
+                    dumps = json_dumps_bytes
+                    with open(output_path, "wb") as f:
+                        f.write(b"[\n")
+                        for chunk in iter(lambda: cursor.fetchmany(cursor.arraysize), []):
+                            for call_id, question, answer in chunk:
+                                record = {
+                                    "call_id": call_id,
+                                    "messages": [
+                                        sys_msg,
+                                        {"role": "user", "content": question},
+                                        {"role": "assistant", "content": answer}
+                                    ]
+                                }
+                                if records_written > 0:
+                                    f.write(b",\n")
+                                f.write(dumps(record))
+                                if len(preview) < 3:
+                                    preview.append(record)
+                                records_written += 1
+                            progress["rows"] = records_written
+                        f.write(b"\n]")
+                    return records_written, preview
+
+                record_count, preview_records = run_export_with_progress(export_json, qa_count)
+
+                if record_count == 0:
+                    os.remove(output_path)
                     st.warning("No QA pairs found with the selected filters.")
                 else:
-                    # Create JSON structure
-                    qa_data = []
-                    for call_id, question, answer in rows:
-                        qa_data.append({
-                            "call_id": call_id,
-                            "messages": [
-                                {"role": "system", "content": system_message},
-                                {"role": "user", "content": question},
-                                {"role": "assistant", "content": answer}
-                            ]
-                        })
-                    
-                    # Save to JSON
-                    output_path = json_dir / output_filename_json
-                    with open(output_path, "w", encoding="utf-8") as f:
-                        json.dump(qa_data, f, indent=2, ensure_ascii=False)
-                    
                     # Show success message
-                    st.success(f"✅ Successfully exported {len(qa_data)} QA pairs to {output_path}")
-                    
-                    # Provide download button
-                    with open(output_path, "r", encoding="utf-8") as f:
-                        json_data = f.read()
+                    st.success(f"✅ Successfully exported {record_count} QA pairs to {output_path}")
                     
+                    # Provide download button; hand the open file to Streamlit
+                    # instead of reading a full copy into memory first
                     st.download_button(
                         label="Download JSON File",
-                        data=json_data,
+                        data=open(output_path, "rb"),
                         file_name=output_filename_json,
                         mime="application/json"
                     )
                     
-                    # Display preview
+                    # Display preview (only the first 3 records were buffered)
                     with st.expander("Preview Data"):
-                        st.json(qa_data[:3] if len(qa_data) > 3 else qa_data)
+                        st.json(preview_records)
             
             except Exception as e:
                 st.error(f"❌ Error exporting to JSON: {str(e)}")
@@ -251,9 +356,7 @@ try:
     # Tab 3: Export to JSONL
     with export_tab3:
         st.markdown("Export QA pairs to a JSONL file for model training.")
-        
-        st.info("This will first export to Excel and then convert to JSONL format.")
-        
+
         # System message for JSONL format
         system_message_jsonl = st.text_area(
             "System Message", 
@@ -265,48 +368,71 @@ try:
         # Export button
         if st.button("Export to JSONL"):
             try:
-                # First export to Excel
-                cursor.execute("SELECT call_id, question, answer FROM qa_pairs")
-                rows = cursor.fetchall()
-                
-                if not rows:
+                sys_msg = {"role": "system", "content": system_message_jsonl}
+
+                # Memoize on db content + system message: re-clicking Export
+                # without changes just reuses the existing file
+                cursor.execute("SELECT MAX(rowid) FROM qa_pairs")
+                max_rowid = cursor.fetchone()[0] or 0
+                cache_key = hashlib.blake2b(
+                    f"{qa_count}:{max_rowid}:{system_message_jsonl}".encode(),
+                    digest_size=16
+                ).hexdigest()
+                jsonl_path = jsonl_dir / f"qa_pairs_{cache_key}.jsonl"
+
+                def export_jsonl(progress):
+                    # Stream rows straight from the database into the JSONL
+                    # file, skipping the temporary Excel round-trip entirely
+                    cursor.execute("SELECT call_id, question, answer FROM qa_pairs")
+                    cursor.arraysize = 2000
+
+                    records_written = 0
+                    dumps = json_dumps_bytes
+                    newline = b"\n"
+                    with open(jsonl_path, "wb") as f:
+                        write = f.write
+                        for chunk in iter(lambda: cursor.fetchmany(cursor.arraysize), []):
+                            for call_id, question, answer in chunk:
+                                write(dumps({
+                                    "messages": [
+                                        sys_msg,
+                                        {"role": "user", "content": question},
+                                        {"role": "assistant", "content": answer}
+                                    ],
+                                    "call_id": call_id
+                                }) + newline)
+                                records_written += 1
+                            progress["rows"] = records_written
+                    return records_written
+
+                if jsonl_path.exists():
+                    st.info("Database unchanged since the last export - reusing the existing JSONL file.")
+                    record_count = qa_count
+                else:
+                    record_count = run_export_with_progress(export_jsonl, qa_count)
+
+                if record_count == 0:
+                    os.remove(jsonl_path)
                     st.warning("No QA pairs found in the database.")
                 else:
-                    # Create DataFrame
-                    df = pd.DataFrame(rows, columns=["Call ID", "Question", "Answer"])
-                    
-                    # Save to Excel temporarily
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    temp_excel_filename = f"temp_qa_pairs_{timestamp}.xlsx"
-                    temp_excel_path = excel_dir / temp_excel_filename
-                    df.to_excel(temp_excel_path, index=False)
-                    
-                    # Convert Excel to JSONL
-                    jsonl_path = convert_excel_files_to_jsonl(
-                        excel_dir=str(excel_dir),
-                        output_dir=str(jsonl_dir),
-                        system_message=system_message_jsonl
-                    )
-                    
                     # Show success message
-                    st.success(f"✅ Successfully exported {len(df)} QA pairs to {jsonl_path}")
-                    
-                    # Provide download button
-                    with open(jsonl_path, "r", encoding="utf-8") as f:
-                        jsonl_data = f.read()
+                    st.success(f"✅ Successfully exported {record_count} QA pairs to {jsonl_path}")
                     
+                    # Provide download button; hand the open file to Streamlit
+                    # instead of reading a full copy into memory first
                     jsonl_filename = os.path.basename(jsonl_path)
                     st.download_button(
                         label="Download JSONL File",
-                        data=jsonl_data,
+                        data=open(jsonl_path, "rb"),
                         file_name=jsonl_filename,
                         mime="application/jsonl"
                     )
-                    
+
                     # Display preview
                     with st.expander("Preview Data"):
                         # Show first few lines of JSONL
-                        lines = jsonl_data.splitlines()[:5]
+                        with open(jsonl_path, "r", encoding="utf-8") as f:
+                            lines = [line.rstrip("\n") for line, _ in zip(f, range(5))]
                         for i, line in enumerate(lines):
                             st.code(line, language="json")
                             if i < len(lines) - 1: